@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+EmoHeal API 请求/响应数据模型
+
+基于msgspec.Struct，请求体直接从字节解码为类型化对象，
+分析结果的结构校验也在C层完成
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import msgspec
+
+try:
+    from typing import Annotated
+except ImportError:  # Python 3.8
+    from typing_extensions import Annotated
+
+# 长度上限在解码阶段由msgspec校验，超长请求不会构造出Python字符串/列表
+MAX_TEXT_LENGTH = 1000
+MAX_BATCH_SIZE = 10
+
+class AnalyzeRequest(msgspec.Struct):
+    """
+    情感分析请求
+    
+    去除首尾空白后的非空与最短长度检查依赖strip()，由接口完成
+    """
+    text: Annotated[str, msgspec.Meta(max_length=MAX_TEXT_LENGTH)] = ""
+    include_suggestions: bool = True
+
+class BatchAnalyzeRequest(msgspec.Struct):
+    """批量情感分析请求 (非字符串条目由接口跳过)"""
+    texts: Annotated[List[Any], msgspec.Meta(min_length=1, max_length=MAX_BATCH_SIZE)]
+
+class EmotionBalance(msgspec.Struct):
+    """情感平衡"""
+    positive: float
+    negative: float
+    neutral: float
+
+class AnalysisStatistics(msgspec.Struct):
+    """分析统计信息"""
+    total_intensity: float
+    max_intensity: float
+    active_emotions_count: int
+    emotion_balance: EmotionBalance
+
+class AnalysisResult(msgspec.Struct):
+    """
+    情感分析结果
+
+    emotion_vector 可能是列表或NumPy数组，长度由接口单独校验
+    """
+    input_text: str
+    emotion_vector: Any
+    emotion_dict: Dict[str, float]
+    top_emotions: List[Tuple[str, float]]
+    statistics: AnalysisStatistics
+    primary_emotion: Tuple[str, float]
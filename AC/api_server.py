@@ -6,21 +6,45 @@ EmoHeal API 服务器
 
 import sys
 import os
+import re
 import json
+import hashlib
+import time
 import logging
-from datetime import datetime
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional
 from pathlib import Path
-from flask import Flask, request, jsonify
+import msgspec
+import numpy as np
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from werkzeug.exceptions import BadRequest, InternalServerError
 
+try:
+    import ahocorasick  # pyahocorasick, 可选依赖
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson  # 可选依赖，加速含大量浮点数的响应序列化
+except ImportError:
+    orjson = None
+
 # 添加项目路径
 sys.path.append(str(Path(__file__).parent))
 
 try:
     from inference_api import EmotionInferenceAPI
-    from config import COWEN_KELTNER_EMOTIONS
+    from batch_worker import BatchingInferenceWorker
+    from config import (
+        COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG,
+        POSITIVE_EMOTIONS, NEGATIVE_EMOTIONS, NEUTRAL_EMOTIONS,
+        POSITIVE_MASK, NEGATIVE_MASK
+    )
+    from api_models import AnalyzeRequest, BatchAnalyzeRequest, AnalysisResult
+    from time_utils import cached_timestamp
 except ImportError as e:
     print(f"⚠️ 无法导入情感分析模块: {e}")
     print("请确保AC模块正确安装和配置")
@@ -32,10 +56,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class EmotionJSONProvider(DefaultJSONProvider):
+    """
+    支持NumPy数组/标量的JSON序列化
+    
+    安装orjson时使用orjson编解码，否则回退到标准库json
+    """
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        return DefaultJSONProvider.default(o)
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(
+            obj,
+            default=self.default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode('utf-8')
+    
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
 # 创建Flask应用
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'emoheal-secret-key-change-in-production'
-app.config['JSON_AS_ASCII'] = False  # 支持中文JSON输出
+app.json = EmotionJSONProvider(app)
+app.json.ensure_ascii = False  # 支持中文JSON输出
 
 # 启用CORS支持
 CORS(app, resources={
@@ -48,6 +102,47 @@ CORS(app, resources={
 
 # 全局变量
 emotion_api: Optional[EmotionInferenceAPI] = None
+batch_worker: Optional[BatchingInferenceWorker] = None
+
+# 分析结果LRU缓存 (模型在进程生命周期内不变，仅在重启时失效)
+_result_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+def _result_cache_key(text: str) -> str:
+    """去除首尾空白后计算缓存键 (XLM-R区分大小写，不做大小写折叠)"""
+    normalized = text.strip()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+def _is_cacheable(result: Dict[str, Any]) -> bool:
+    """
+    判断结果是否可以写入缓存
+    
+    推理异常会被转换为错误结果或全零向量，这类瞬时失败不能缓存，
+    否则同一文本在被淘汰前会一直返回失败结果
+    """
+    if "error" in result:
+        return False
+    return bool(np.any(np.asarray(result.get("emotion_vector", ()), dtype=np.float32)))
+
+def _result_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """读取缓存结果，命中时标记为最近使用"""
+    with _result_cache_lock:
+        result = _result_cache.get(key)
+        if result is not None:
+            _result_cache.move_to_end(key)
+        return result
+
+def _result_cache_put(key: str, result: Dict[str, Any]):
+    """写入缓存结果，超出容量时淘汰最久未使用的条目"""
+    max_size = INFERENCE_CONFIG["result_cache_size"]
+    if max_size <= 0:
+        return
+    
+    with _result_cache_lock:
+        _result_cache[key] = result
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > max_size:
+            _result_cache.popitem(last=False)
 
 def initialize_emotion_api():
     """初始化情感分析API"""
@@ -57,7 +152,6 @@ def initialize_emotion_api():
         logger.info("🧠 初始化情感分析API...")
         emotion_api = EmotionInferenceAPI(load_finetuned=True)
         logger.info("✅ 情感分析API初始化成功")
-        return True
     except Exception as e:
         logger.error(f"❌ 情感分析API初始化失败: {e}")
         # 尝试使用预训练模型
@@ -65,19 +159,81 @@ def initialize_emotion_api():
             logger.info("🔄 尝试使用预训练模型...")
             emotion_api = EmotionInferenceAPI(load_finetuned=False)
             logger.info("✅ 预训练模型加载成功")
-            return True
         except Exception as e2:
             logger.error(f"❌ 预训练模型也无法加载: {e2}")
             return False
+    
+    if os.environ.get("AC_SKIP_WARMUP") == "1":
+        logger.info("⏭️ 跳过模型预热 (AC_SKIP_WARMUP=1)")
+    else:
+        warmup_emotion_api()
+    
+    initialize_batch_worker()
+    return True
+
+def warmup_emotion_api():
+    """
+    用虚拟输入预热模型和分词器
+    
+    首次前向会触发CUDA内核加载、cuBLAS句柄初始化和分词器初始化，
+    在启动阶段完成这些开销，避免落到第一个用户请求上。
+    按常见序列长度各跑一次，让cuDNN/cuBLAS为不同形状选好算法。
+    """
+    start_time = time.perf_counter()
+    
+    try:
+        for _ in range(INFERENCE_CONFIG["warmup_iterations"]):
+            emotion_api.analyze_emotion_with_context("预热文本 warmup")
+        
+        warmup_texts = ["预" * length for length in INFERENCE_CONFIG["warmup_lengths"]]
+        for text in warmup_texts:
+            emotion_api.analyze_emotion_with_context(text)
+        emotion_api.analyze_emotion_batch(warmup_texts)
+    except Exception as e:
+        logger.warning(f"⚠️ 模型预热失败: {e}")
+        return
+    
+    logger.info(f"🔥 模型预热完成 ({time.perf_counter() - start_time:.2f}s)")
+
+def initialize_batch_worker():
+    """初始化微批处理工作线程，把并发的单文本请求合并为一次前向计算"""
+    global batch_worker
+    
+    batch_worker = BatchingInferenceWorker(
+        emotion_api,
+        max_batch_size=INFERENCE_CONFIG["max_batch_size"],
+        batch_timeout=INFERENCE_CONFIG["batch_timeout"]
+    )
+
+_startup_done = False
+_startup_lock = threading.Lock()
 
-@app.before_first_request
 def startup():
-    """应用启动时的初始化"""
-    logger.info("🚀 启动EmoHeal API服务器")
+    """
+    应用启动时的初始化
+    
+    默认在模块导入时执行 (见文件末尾)，gunicorn --preload 时
+    只在master进程中加载一次模型，worker通过fork共享内存页。
+    重复调用是安全的。
+    """
+    global _startup_done
     
-    # 初始化情感分析API
-    if not initialize_emotion_api():
-        logger.warning("⚠️ 情感分析功能不可用，将使用模拟数据")
+    if _startup_done:
+        return
+    
+    with _startup_lock:
+        if _startup_done:
+            return
+        
+        logger.info("🚀 启动EmoHeal API服务器")
+        
+        # 初始化情感分析API
+        if not initialize_emotion_api():
+            logger.warning("⚠️ 情感分析功能不可用，将使用模拟数据")
+        
+        check_result_contract()
+        
+        _startup_done = True
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -86,7 +242,7 @@ def health_check():
     
     status = {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": cached_timestamp(),
         "version": "1.0.0",
         "emotion_api_available": emotion_api is not None
     }
@@ -132,37 +288,47 @@ def analyze_emotion_with_context():
         if not request.is_json:
             raise BadRequest("请求必须是JSON格式")
         
-        data = request.get_json()
-        if not data:
-            raise BadRequest("请求数据不能为空")
+        # 长度上限由AnalyzeRequest声明并在解码时校验
+        req = decode_request(AnalyzeRequest)
         
-        text = data.get('text', '').strip()
+        text = req.text.strip()
         if not text:
             raise BadRequest("文本内容不能为空")
         
         if len(text) < 2:
             raise BadRequest("文本内容太短，至少需要2个字符")
         
-        if len(text) > 1000:
-            raise BadRequest("文本内容太长，最多支持1000个字符")
-        
         logger.info(f"🔍 分析请求: {text[:50]}...")
         
         # 调用情感分析
+        cache_status = "MISS"
         if emotion_api:
-            # 使用真实的情感分析API
-            result = emotion_api.analyze_emotion_with_context(text)
+            cache_key = _result_cache_key(text)
+            cached_result = _result_cache_get(cache_key)
+            
+            if cached_result is not None:
+                cache_status = "HIT"
+                validated_result = dict(cached_result, input_text=text, analysis_timestamp=cached_timestamp())
+            else:
+                # 使用真实的情感分析API，经微批处理线程与并发请求合并推理
+                future = batch_worker.submit(text)
+                result = future.result(timeout=INFERENCE_CONFIG["request_timeout"])
+                
+                validated_result = _debug_validate(result)
+                if _is_cacheable(validated_result):
+                    _result_cache_put(cache_key, validated_result)
         else:
             # 使用模拟数据
             logger.warning("⚠️ 使用模拟情感分析数据")
             result = generate_mock_emotion_analysis(text)
+            
+            validated_result = _debug_validate(result)
         
-        # 确保返回数据格式正确
-        validated_result = validate_analysis_result(result)
-        
-        logger.info("✅ 情感分析完成")
+        logger.info(f"✅ 情感分析完成 (cache {cache_status})")
         
-        return jsonify(validated_result), 200
+        response = jsonify(validated_result)
+        response.headers['X-Cache'] = cache_status
+        return response, 200
         
     except BadRequest as e:
         logger.warning(f"⚠️ 请求错误: {e.description}")
@@ -180,64 +346,47 @@ def analyze_emotion_with_context():
 
 @app.route('/api/emotion/emotions-list', methods=['GET'])
 def get_emotions_list():
-    """获取支持的情感列表"""
-    try:
-        emotions_info = []
-        
-        for emotion_zh in COWEN_KELTNER_EMOTIONS:
-            emotion_info = {
-                "zh": emotion_zh,
-                "en": get_emotion_english_name(emotion_zh),
-                "category": get_emotion_category(emotion_zh)
-            }
-            emotions_info.append(emotion_info)
-        
-        return jsonify({
-            "emotions": emotions_info,
-            "total_count": len(emotions_info),
-            "categories": {
-                "positive": ["快乐", "兴奋", "娱乐", "钦佩", "崇拜", "审美欣赏", "敬畏", "入迷", "兴趣", "浪漫"],
-                "negative": ["愤怒", "焦虑", "悲伤", "恐惧", "内疚", "恐怖", "失望", "厌恶", "嫉妒", "蔑视"],
-                "neutral": ["平静", "无聊", "困惑", "尴尬", "同情", "渴望", "怀旧"]
-            }
-        }), 200
-        
-    except Exception as e:
-        logger.error(f"❌ 获取情感列表失败: {e}")
-        return jsonify({"error": "获取情感列表失败"}), 500
+    """获取支持的情感列表 (响应体在模块加载时预先序列化)"""
+    return Response(_EMOTIONS_LIST_BYTES, status=200, mimetype='application/json')
 
 @app.route('/api/emotion/batch-analyze', methods=['POST'])
 def batch_analyze_emotions():
-    """批量情感分析接口"""
+    """
+    批量情感分析接口
+    
+    默认返回单个JSON对象；带 ?stream=1 时以NDJSON逐行返回，
+    每个子批次完成即输出，每行带 index 字段 (对应texts中的位置)
+    """
     try:
         if not request.is_json:
             raise BadRequest("请求必须是JSON格式")
         
-        data = request.get_json()
-        texts = data.get('texts', [])
+        # texts必须是1~10个元素的数组，由BatchAnalyzeRequest在解码时校验
+        texts = decode_request(BatchAnalyzeRequest).texts
         
-        if not texts or not isinstance(texts, list):
-            raise BadRequest("texts字段必须是非空数组")
+        indexed_texts = [
+            (i, text.strip()) for i, text in enumerate(texts)
+            if isinstance(text, str) and text.strip()
+        ]
         
-        if len(texts) > 10:
-            raise BadRequest("批量分析最多支持10个文本")
+        if request.args.get('stream') == '1':
+            return Response(
+                stream_with_context(_stream_batch_results(indexed_texts)),
+                status=200,
+                mimetype='application/x-ndjson'
+            )
         
-        results = []
-        for text in texts:
-            if not isinstance(text, str) or not text.strip():
-                continue
-                
-            if emotion_api:
-                result = emotion_api.analyze_emotion_with_context(text.strip())
-            else:
-                result = generate_mock_emotion_analysis(text.strip())
-            
-            results.append(validate_analysis_result(result))
+        valid_texts = [text for _, text in indexed_texts]
+        
+        # 整批直接推理，不经过微批处理队列
+        raw_results = _analyze_texts(valid_texts)
+        
+        results = [_debug_validate(result) for result in raw_results]
         
         return jsonify({
             "results": results,
             "count": len(results),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": cached_timestamp()
         }), 200
         
     except BadRequest as e:
@@ -246,71 +395,146 @@ def batch_analyze_emotions():
         logger.error(f"❌ 批量分析失败: {e}")
         return jsonify({"error": "批量分析失败"}), 500
 
+def _analyze_texts(texts: List[str]) -> List[Dict[str, Any]]:
+    """对一组文本执行情感分析 (真实模型整批推理，否则使用模拟数据)"""
+    if emotion_api:
+        return emotion_api.analyze_emotion_batch(texts)
+    return [generate_mock_emotion_analysis(text) for text in texts]
+
+def _stream_batch_results(indexed_texts: List[tuple]):
+    """按子批次推理并逐行产出NDJSON结果"""
+    chunk_size = INFERENCE_CONFIG["stream_chunk_size"]
+    
+    for start in range(0, len(indexed_texts), chunk_size):
+        chunk = indexed_texts[start:start + chunk_size]
+        
+        try:
+            chunk_results = _analyze_texts([text for _, text in chunk])
+            lines = []
+            for (index, _), result in zip(chunk, chunk_results):
+                result = dict(_debug_validate(result), index=index)
+                lines.append(app.json.dumps(result))
+        except Exception as e:
+            # 响应头已发送，错误以结果行的形式返回
+            logger.error(f"❌ 批量分析失败: {e}")
+            lines = [app.json.dumps({"index": index, "error": "批量分析失败"}) for index, _ in chunk]
+        
+        yield "\n".join(lines) + "\n"
+
+# 模拟数据使用的情感索引 (模块加载时预计算)
+_EMOTION_INDEX = {name: i for i, name in enumerate(COWEN_KELTNER_EMOTIONS)}
+
+# 简单的关键词情感映射
+_MOCK_EMOTION_KEYWORDS = {
+    "快乐": ["开心", "高兴", "快乐", "愉悦", "happy", "joy", "glad"],
+    "悲伤": ["悲伤", "难过", "伤心", "痛苦", "sad", "sorrow", "grief"],
+    "愤怒": ["愤怒", "生气", "愤恨", "愤慨", "angry", "mad", "furious"],
+    "焦虑": ["焦虑", "紧张", "担心", "不安", "anxiety", "worried", "nervous"],
+    "恐惧": ["害怕", "恐惧", "恐慌", "恐怖", "fear", "scared", "afraid"],
+    "平静": ["平静", "安静", "宁静", "放松", "calm", "peaceful", "serene"]
+}
+
+# 关键词按是否需要大小写折叠拆分: 中文关键词直接匹配原文，英文关键词匹配小写文本
+_CN_KEYWORDS = {
+    emotion: [kw for kw in keywords if not kw.isascii()]
+    for emotion, keywords in _MOCK_EMOTION_KEYWORDS.items()
+}
+_EN_KEYWORDS = {
+    emotion: [kw for kw in keywords if kw.isascii()]
+    for emotion, keywords in _MOCK_EMOTION_KEYWORDS.items()
+}
+_ASCII_ALPHA_RE = re.compile(r'[A-Za-z]')
+
+def _build_keyword_automaton(keyword_table: Dict[str, List[str]]):
+    """构建关键词Aho-Corasick自动机，未安装pyahocorasick时返回None"""
+    if ahocorasick is None:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for emotion, keywords in keyword_table.items():
+        for keyword in keywords:
+            automaton.add_word(keyword, (keyword, emotion))
+    automaton.make_automaton()
+    return automaton
+
+_CN_KEYWORD_AUTOMATON = _build_keyword_automaton(_CN_KEYWORDS)
+_EN_KEYWORD_AUTOMATON = _build_keyword_automaton(_EN_KEYWORDS)
+_MOCK_EMOTIONS = list(_MOCK_EMOTION_KEYWORDS.keys())
+
+# 模拟数据随机数生成器 (设置 AC_MOCK_SEED 可复现结果)
+_rng = np.random.default_rng(
+    int(os.environ["AC_MOCK_SEED"]) if os.environ.get("AC_MOCK_SEED") else None
+)
+
+def _scan_keywords(text: str, keyword_table: Dict[str, List[str]], automaton,
+                   matched: Dict[str, set]):
+    """在文本中查找一组关键词，结果合并到matched中"""
+    if automaton is not None:
+        for _, (keyword, emotion) in automaton.iter(text):
+            matched.setdefault(emotion, set()).add(keyword)
+        return
+    
+    for emotion, keywords in keyword_table.items():
+        for keyword in keywords:
+            if keyword in text:
+                matched.setdefault(emotion, set()).add(keyword)
+
+def _match_emotion_keywords(text: str) -> Dict[str, set]:
+    """
+    查找文本中出现的情感关键词
+    
+    有自动机时单次O(L)扫描完成全部关键词匹配，否则回退到逐关键词子串查找。
+    英文关键词只在文本含ASCII字母时才匹配，此时才需要生成小写副本。
+    
+    Returns:
+        {情感名: 命中的关键词集合}，每个关键词无论出现几次只计一次
+    """
+    matched: Dict[str, set] = {}
+    
+    _scan_keywords(text, _CN_KEYWORDS, _CN_KEYWORD_AUTOMATON, matched)
+    if _ASCII_ALPHA_RE.search(text):
+        _scan_keywords(text.lower(), _EN_KEYWORDS, _EN_KEYWORD_AUTOMATON, matched)
+    
+    return matched
+
 def generate_mock_emotion_analysis(text: str) -> Dict[str, Any]:
     """生成模拟的情感分析结果"""
-    import random
-    import numpy as np
-    
-    # 简单的关键词情感映射
-    emotion_keywords = {
-        "快乐": ["开心", "高兴", "快乐", "愉悦", "happy", "joy", "glad"],
-        "悲伤": ["悲伤", "难过", "伤心", "痛苦", "sad", "sorrow", "grief"],
-        "愤怒": ["愤怒", "生气", "愤恨", "愤慨", "angry", "mad", "furious"],
-        "焦虑": ["焦虑", "紧张", "担心", "不安", "anxiety", "worried", "nervous"],
-        "恐惧": ["害怕", "恐惧", "恐慌", "恐怖", "fear", "scared", "afraid"],
-        "平静": ["平静", "安静", "宁静", "放松", "calm", "peaceful", "serene"]
-    }
-    
     # 检测文本中的情感关键词
     detected_emotions = {}
-    text_lower = text.lower()
     
-    for emotion, keywords in emotion_keywords.items():
-        score = 0
-        for keyword in keywords:
-            if keyword in text_lower:
-                score += 0.3 + random.random() * 0.5
-        
-        if score > 0:
-            detected_emotions[emotion] = min(score, 1.0)
+    for emotion, keywords in _match_emotion_keywords(text).items():
+        score = float(np.sum(0.3 + _rng.random(len(keywords)) * 0.5))
+        detected_emotions[emotion] = min(score, 1.0)
     
     # 如果没有检测到关键词，生成随机情感
     if not detected_emotions:
-        primary_emotion = random.choice(list(emotion_keywords.keys()))
-        detected_emotions[primary_emotion] = 0.4 + random.random() * 0.4
+        primary_emotion = _MOCK_EMOTIONS[_rng.integers(len(_MOCK_EMOTIONS))]
+        detected_emotions[primary_emotion] = 0.4 + float(_rng.random()) * 0.4
     
-    # 生成27维向量
-    emotion_vector = np.zeros(27, dtype=np.float32)
-    emotion_dict = {}
+    # 生成27维向量: 低强度随机底噪，检测到的情感覆盖为对应强度
+    emotion_vector = _rng.random(27, dtype=np.float32) * 0.2
+    detected_indices = [_EMOTION_INDEX[name] for name in detected_emotions]
+    emotion_vector[detected_indices] = list(detected_emotions.values())
     
-    for i, emotion_name in enumerate(COWEN_KELTNER_EMOTIONS):
-        if emotion_name in detected_emotions:
-            intensity = detected_emotions[emotion_name]
-        else:
-            intensity = random.random() * 0.2  # 低强度随机值
-        
-        emotion_vector[i] = intensity
-        emotion_dict[emotion_name] = float(intensity)
+    emotion_dict = dict(zip(COWEN_KELTNER_EMOTIONS, emotion_vector.tolist()))
     
     # 获取前5个最强的情感
-    top_emotions = sorted(emotion_dict.items(), key=lambda x: x[1], reverse=True)[:5]
+    top_indices = np.argsort(emotion_vector)[::-1][:5]
+    top_emotions = [(COWEN_KELTNER_EMOTIONS[i], float(emotion_vector[i])) for i in top_indices]
     
     # 计算统计信息
-    total_intensity = float(np.sum(emotion_vector))
-    max_intensity = float(np.max(emotion_vector))
-    active_emotions = len([x for x in emotion_vector if x > 0.1])
+    total_intensity = float(emotion_vector.sum())
+    max_intensity = float(emotion_vector.max())
+    active_emotions = int(np.count_nonzero(emotion_vector > 0.1))
     
-    # 情感平衡计算
-    positive_emotions = ["快乐", "兴奋", "娱乐", "钦佩", "崇拜", "审美欣赏", "敬畏", "入迷", "兴趣", "浪漫"]
-    negative_emotions = ["愤怒", "焦虑", "悲伤", "恐惧", "内疚", "恐怖", "失望", "厌恶", "嫉妒", "蔑视"]
-    
-    positive_score = sum(emotion_dict.get(e, 0) for e in positive_emotions)
-    negative_score = sum(emotion_dict.get(e, 0) for e in negative_emotions)
+    # 情感平衡计算 (掩码求和)
+    positive_score = float(emotion_vector[POSITIVE_MASK].sum())
+    negative_score = float(emotion_vector[NEGATIVE_MASK].sum())
     neutral_score = total_intensity - positive_score - negative_score
     
     return {
         "input_text": text,
-        "emotion_vector": emotion_vector.tolist(),
+        "emotion_vector": emotion_vector,  # 由EmotionJSONProvider直接序列化
         "emotion_dict": emotion_dict,
         "top_emotions": top_emotions,
         "statistics": {
@@ -324,89 +548,137 @@ def generate_mock_emotion_analysis(text: str) -> Dict[str, Any]:
             }
         },
         "primary_emotion": top_emotions[0] if top_emotions else ["平静", 0.5],
-        "analysis_timestamp": datetime.now().isoformat()
+        "analysis_timestamp": cached_timestamp()
     }
 
-def validate_analysis_result(result: Dict[str, Any]) -> Dict[str, Any]:
-    """验证和规范化分析结果"""
-    # 确保必需字段存在
-    required_fields = [
-        'input_text', 'emotion_vector', 'emotion_dict', 
-        'top_emotions', 'statistics', 'primary_emotion'
-    ]
+def decode_request(request_type: type) -> Any:
+    """
+    将请求体字节直接解码为类型化的请求模型
+    
+    Raises:
+        BadRequest: 请求体为空、不是合法JSON或字段类型不匹配
+    """
+    body = request.get_data()
+    if not body:
+        raise BadRequest("请求数据不能为空")
     
-    for field in required_fields:
-        if field not in result:
-            raise ValueError(f"分析结果缺少必需字段: {field}")
+    try:
+        return msgspec.json.decode(body, type=request_type)
+    except msgspec.ValidationError as e:
+        raise BadRequest(f"请求数据格式错误: {e}")
+    except msgspec.DecodeError:
+        raise BadRequest("请求必须是合法的JSON")
+
+def validate_analysis_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """验证分析结果结构 (字段与类型由AnalysisResult模型校验)"""
+    try:
+        msgspec.convert(result, type=AnalysisResult)
+    except msgspec.ValidationError as e:
+        raise ValueError(f"分析结果格式错误: {e}")
     
     # 验证emotion_vector长度
     if len(result['emotion_vector']) != 27:
         raise ValueError("情感向量长度必须是27")
     
-    # 验证statistics结构
-    stats = result['statistics']
-    required_stats = ['total_intensity', 'max_intensity', 'active_emotions_count', 'emotion_balance']
-    
-    for stat in required_stats:
-        if stat not in stats:
-            raise ValueError(f"统计信息缺少字段: {stat}")
-    
-    # 验证emotion_balance结构
-    balance = stats['emotion_balance']
-    required_balance = ['positive', 'negative', 'neutral']
+    return result
+
+def _debug_validate(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    请求路径上的结果校验
     
-    for bal in required_balance:
-        if bal not in balance:
-            raise ValueError(f"情感平衡信息缺少字段: {bal}")
+    结果均由本服务的推理API或模拟生成器产生，完整格式约定在启动时
+    由check_result_contract()校验一次，调试模式下才逐请求完整校验。
+    推理失败时返回的错误结果缺少统计字段，始终检查并抛出异常，
+    由调用方返回500 (也因此不会写入结果缓存)。
     
+    Raises:
+        ValueError: 结果为推理失败的错误结果，或调试模式下格式校验失败
+    """
+    if "error" in result:
+        raise ValueError(f"情感分析失败: {result['error']}")
+    if app.debug:
+        return validate_analysis_result(result)
     return result
 
+def check_result_contract() -> bool:
+    """启动时用一条样例输出校验分析结果格式"""
+    try:
+        validate_analysis_result(_analyze_texts(["预热文本 warmup"])[0])
+    except Exception as e:
+        logger.error(f"❌ 分析结果格式校验失败: {e}")
+        return False
+    
+    logger.info("✅ 分析结果格式校验通过")
+    return True
+
+# 中文情感名到英文名的映射
+_EN_NAME_MAP = {
+    "钦佩": "Admiration",
+    "崇拜": "Adoration", 
+    "审美欣赏": "Aesthetic Appreciation",
+    "娱乐": "Amusement",
+    "愤怒": "Anger",
+    "焦虑": "Anxiety",
+    "敬畏": "Awe",
+    "尴尬": "Embarrassment",
+    "无聊": "Boredom",
+    "平静": "Calmness",
+    "困惑": "Confusion",
+    "蔑视": "Contempt",
+    "渴望": "Craving",
+    "失望": "Disappointment",
+    "厌恶": "Disgust",
+    "同情": "Empathic Pain",
+    "入迷": "Entrancement",
+    "嫉妒": "Envy",
+    "兴奋": "Excitement",
+    "恐惧": "Fear",
+    "内疚": "Guilt",
+    "恐怖": "Horror",
+    "兴趣": "Interest",
+    "快乐": "Joy",
+    "怀旧": "Nostalgia",
+    "浪漫": "Romance",
+    "悲伤": "Sadness"
+}
+
 def get_emotion_english_name(chinese_name: str) -> str:
     """获取中文情感对应的英文名称"""
-    emotion_mapping = {
-        "钦佩": "Admiration",
-        "崇拜": "Adoration", 
-        "审美欣赏": "Aesthetic Appreciation",
-        "娱乐": "Amusement",
-        "愤怒": "Anger",
-        "焦虑": "Anxiety",
-        "敬畏": "Awe",
-        "尴尬": "Embarrassment",
-        "无聊": "Boredom",
-        "平静": "Calmness",
-        "困惑": "Confusion",
-        "蔑视": "Contempt",
-        "渴望": "Craving",
-        "失望": "Disappointment",
-        "厌恶": "Disgust",
-        "同情": "Empathic Pain",
-        "入迷": "Entrancement",
-        "嫉妒": "Envy",
-        "兴奋": "Excitement",
-        "恐惧": "Fear",
-        "内疚": "Guilt",
-        "恐怖": "Horror",
-        "兴趣": "Interest",
-        "快乐": "Joy",
-        "怀旧": "Nostalgia",
-        "浪漫": "Romance",
-        "悲伤": "Sadness"
-    }
-    
-    return emotion_mapping.get(chinese_name, chinese_name)
+    return _EN_NAME_MAP.get(chinese_name, chinese_name)
 
 def get_emotion_category(emotion_name: str) -> str:
     """获取情感类别"""
-    positive_emotions = ["快乐", "兴奋", "娱乐", "钦佩", "崇拜", "审美欣赏", "敬畏", "入迷", "兴趣", "浪漫"]
-    negative_emotions = ["愤怒", "焦虑", "悲伤", "恐惧", "内疚", "恐怖", "失望", "厌恶", "嫉妒", "蔑视"]
-    
-    if emotion_name in positive_emotions:
+    if emotion_name in POSITIVE_EMOTIONS:
         return "positive"
-    elif emotion_name in negative_emotions:
+    elif emotion_name in NEGATIVE_EMOTIONS:
         return "negative"
     else:
         return "neutral"
 
+def _build_emotions_list_payload() -> Dict[str, Any]:
+    """构建情感列表接口的响应数据 (进程生命周期内不变)"""
+    emotions_info = [
+        {
+            "zh": emotion_zh,
+            "en": get_emotion_english_name(emotion_zh),
+            "category": get_emotion_category(emotion_zh)
+        }
+        for emotion_zh in COWEN_KELTNER_EMOTIONS
+    ]
+    
+    return {
+        "emotions": emotions_info,
+        "total_count": len(emotions_info),
+        "categories": {
+            "positive": [e for e in COWEN_KELTNER_EMOTIONS if e in POSITIVE_EMOTIONS],
+            "negative": [e for e in COWEN_KELTNER_EMOTIONS if e in NEGATIVE_EMOTIONS],
+            "neutral": [e for e in COWEN_KELTNER_EMOTIONS if e in NEUTRAL_EMOTIONS]
+        }
+    }
+
+_EMOTIONS_LIST_PAYLOAD = _build_emotions_list_payload()
+_EMOTIONS_LIST_BYTES = json.dumps(_EMOTIONS_LIST_PAYLOAD, ensure_ascii=False).encode('utf-8')
+
 @app.errorhandler(404)
 def not_found(error):
     """404错误处理"""
@@ -423,6 +695,54 @@ def internal_error(error):
         "message": "服务器遇到了问题，请稍后重试"
     }), 500
 
+def _gunicorn_worker_args(workers: int, threads: int) -> List[str]:
+    """
+    根据推理设备选择gunicorn worker模型
+    
+    CPU: 多个sync worker，--preload 后模型通过copy-on-write共享
+    GPU: 模型无法在进程间复制，固定1个worker并使用gthread多线程；
+         不使用 --preload，否则master中已初始化的CUDA上下文在fork后不可用，
+         worker内每次推理都会失败
+    """
+    try:
+        import torch
+        use_gpu = torch.cuda.is_available()
+    except ImportError:
+        use_gpu = False
+    
+    if use_gpu:
+        return ["-w", "1", "-k", "gthread", "--threads", str(threads)]
+    
+    # 告知配置模块worker数，各worker的算子内线程数按此均分CPU核心
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    return ["--preload", "-w", str(workers), "-k", "sync"]
+
+def run_gunicorn(host: str, port: int, workers: int, threads: int):
+    """用gunicorn替换当前进程启动生产服务器"""
+    import shutil
+    
+    gunicorn_bin = shutil.which("gunicorn")
+    if gunicorn_bin is None:
+        return False
+    
+    argv = [
+        gunicorn_bin,
+        "--bind", f"{host}:{port}",
+        "--chdir", str(Path(__file__).parent),
+        "--timeout", "120",
+        *_gunicorn_worker_args(workers, threads),
+        "wsgi:app"
+    ]
+    logger.info(f"🚀 使用gunicorn启动: {' '.join(argv[1:])}")
+    os.execv(gunicorn_bin, argv)
+
+# 导入即初始化；AC_LAZY_INIT=1 时推迟到首个请求 (Flask 2.3+ 已移除before_first_request)
+# 直接运行脚本时由__main__决定，避免exec到gunicorn前白白加载一次模型
+if os.environ.get("AC_LAZY_INIT") == "1":
+    app.before_request(startup)
+elif __name__ != '__main__':
+    startup()
+
 if __name__ == '__main__':
     import argparse
     
@@ -430,9 +750,19 @@ if __name__ == '__main__':
     parser.add_argument('--host', default='0.0.0.0', help='Host to bind to')
     parser.add_argument('--port', type=int, default=5000, help='Port to bind to')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of gunicorn workers (CPU inference)')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='Number of gunicorn threads (GPU inference)')
+    parser.add_argument('--skip-warmup', action='store_true',
+                        help='Skip model warmup for faster dev restarts')
     
     args = parser.parse_args()
     
+    # 通过环境变量传递，exec到gunicorn后导入时的初始化同样生效
+    if args.skip_warmup:
+        os.environ["AC_SKIP_WARMUP"] = "1"
+    
     print(f"""
 🎵 EmoHeal API Server
 ====================
@@ -450,9 +780,16 @@ Frontend URL: http://{args.host}:{args.port}/
 API Base URL: http://{args.host}:{args.port}/api/
 """)
     
+    # 非调试模式交给gunicorn多进程服务，未安装gunicorn时回退到Flask开发服务器
+    if not args.debug:
+        run_gunicorn(args.host, args.port, args.workers, args.threads)
+        logger.warning("⚠️ 未找到gunicorn，回退到Flask开发服务器 (pip install gunicorn)")
+    
+    startup()
+    
     app.run(
         host=args.host,
         port=args.port,
         debug=args.debug,
         use_reloader=args.debug
-    )
\ No newline at end of file
+    )
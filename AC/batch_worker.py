@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+情感分析微批处理工作线程
+
+将并发请求的单条文本聚合为一个批次，共享一次模型前向计算
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class BatchingInferenceWorker:
+    """
+    微批处理推理工作线程
+
+    请求线程调用submit()把文本放入队列并获得Future，
+    后台线程最多等待batch_timeout秒或凑满max_batch_size条后，
+    调用emotion_api.analyze_emotion_batch()一次性推理并回填结果。
+    """
+
+    def __init__(self, emotion_api, max_batch_size: int = 32, batch_timeout: float = 0.01):
+        """
+        初始化工作线程
+
+        Args:
+            emotion_api: 提供analyze_emotion_batch(texts)的推理API
+            max_batch_size: 单批次最大文本数
+            batch_timeout: 凑批等待窗口 (秒)
+        """
+        self.emotion_api = emotion_api
+        self.max_batch_size = max_batch_size
+        self.batch_timeout = batch_timeout
+
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid: Optional[int] = None
+
+    def _ensure_started(self):
+        """
+        按需启动后台线程
+
+        gunicorn --preload 在master中创建本对象，fork后线程不会被继承，
+        因此按进程号惰性启动，每个worker进程各自拥有一个线程。
+        """
+        pid = os.getpid()
+        if self._owner_pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._owner_pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="emotion-batching-worker",
+                daemon=True
+            )
+            self._owner_pid = pid
+            self._thread.start()
+            logger.info(f"🧵 微批处理线程已启动 (pid={pid}, max_batch_size={self.max_batch_size})")
+
+    def submit(self, text: str) -> Future:
+        """
+        提交单条文本
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            结果为analyze_emotion_with_context格式字典的Future
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect_batch(self) -> List[Tuple[str, Future]]:
+        """阻塞等待首条请求，然后在等待窗口内尽量凑满一个批次"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_timeout
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """后台线程主循环"""
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+
+            try:
+                results: List[Dict[str, Any]] = self.emotion_api.analyze_emotion_batch(texts)
+            except Exception as e:
+                logger.error(f"❌ 微批处理推理失败: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
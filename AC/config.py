@@ -6,17 +6,29 @@ AC模块配置文件
 import os
 from pathlib import Path
 
+import numpy as np
+
 # 基础路径
 AC_MODULE_ROOT = Path(__file__).parent
 PROJECT_ROOT = AC_MODULE_ROOT.parent
 
-# Cowen & Keltner (2017) 27维情绪标准
-COWEN_KELTNER_EMOTIONS = [
+# Cowen & Keltner (2017) 27维情绪标准 (元组，防止运行时被修改)
+COWEN_KELTNER_EMOTIONS = (
     "钦佩", "崇拜", "审美欣赏", "娱乐", "愤怒", "焦虑", "敬畏", "尴尬",
     "无聊", "平静", "困惑", "蔑视", "渴望", "失望", "厌恶", "同情",
     "入迷", "嫉妒", "兴奋", "恐惧", "内疚", "恐怖", "兴趣", "快乐",
     "怀旧", "浪漫", "悲伤"
-]
+)
+
+# 情绪类别 (集合用于O(1)成员判断)
+POSITIVE_EMOTIONS = frozenset({"快乐", "兴奋", "娱乐", "钦佩", "崇拜", "审美欣赏", "敬畏", "入迷", "兴趣", "浪漫"})
+NEGATIVE_EMOTIONS = frozenset({"愤怒", "焦虑", "悲伤", "恐惧", "内疚", "恐怖", "失望", "厌恶", "嫉妒", "蔑视"})
+NEUTRAL_EMOTIONS = frozenset({"平静", "无聊", "困惑", "尴尬", "同情", "渴望", "怀旧"})
+
+# 与COWEN_KELTNER_EMOTIONS顺序对齐的类别掩码，用于27维向量的分类求和
+POSITIVE_MASK = np.array([e in POSITIVE_EMOTIONS for e in COWEN_KELTNER_EMOTIONS], dtype=bool)
+NEGATIVE_MASK = np.array([e in NEGATIVE_EMOTIONS for e in COWEN_KELTNER_EMOTIONS], dtype=bool)
+NEUTRAL_MASK = np.array([e in NEUTRAL_EMOTIONS for e in COWEN_KELTNER_EMOTIONS], dtype=bool)
 
 # GoEmotions原始标签 (27个类别)
 GOEMOTIONS_LABELS = [
@@ -87,7 +99,8 @@ DATA_PATHS = {
 MODEL_PATHS = {
     "pretrained_cache": AC_MODULE_ROOT / "models" / "pretrained",
     "finetuned_model": AC_MODULE_ROOT / "models" / "finetuned_xlm_roberta",
-    "tokenizer": AC_MODULE_ROOT / "models" / "finetuned_xlm_roberta"
+    "tokenizer": AC_MODULE_ROOT / "models" / "finetuned_xlm_roberta",
+    "onnx_model": AC_MODULE_ROOT / "models" / "onnx" / "emotion_classifier.onnx"  # 按checkpoint指纹校验，更换模型后自动重新导出
 }
 
 # 确保目录存在
@@ -109,6 +122,28 @@ LOG_CONFIG = {
 INFERENCE_CONFIG = {
     "confidence_threshold": 0.1,    # 情绪强度阈值
     "max_batch_size": 32,           # 批处理大小
+    "batch_timeout": 0.01,          # 微批处理凑批等待窗口 (秒)
+    "length_bucket_ratio": 1.25,    # 分桶批处理: 桶内最长/最短token数上限
+    "stream_chunk_size": 4,         # 流式批量分析: 每个子批次的文本数
+    "request_timeout": 30.0,        # 单请求等待推理结果的超时 (秒)
+    "result_cache_size": 4096,      # 分析结果LRU缓存条目数 (0表示禁用)
+    "tokenize_cache_size": 4096,    # 单文本分词结果LRU缓存条目数
+    "warmup_iterations": 3,         # 启动预热: 固定短文本的前向次数
+    "warmup_lengths": [8, 64, 256, 512],  # 启动预热: 覆盖的序列长度 (字符数)
     "device": "auto",               # 设备选择 ("auto", "cpu", "cuda")
+    "precision": "auto",            # 推理精度 ("auto", "fp32", "fp16", "bf16", "int8")
+    "backend": "auto",              # 推理后端 ("auto": 有onnxruntime时用ONNX, "onnx", "torch")
+    "torch_compile": True,          # PyTorch后端: 启动时用torch.compile编译前向
     "output_format": "vector"       # 输出格式 ("vector", "dict", "top_k")
+}
+
+# 同一台机器上的推理进程数 (gunicorn同样读取WEB_CONCURRENCY作为默认worker数)
+# 默认线程数按进程数均分CPU核心，避免多个worker各开满线程造成N×N超额订阅
+_WORKER_PROCESSES = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+
+# PyTorch运行时配置
+TORCH_CONFIG = {
+    "num_threads": int(os.environ.get("TORCH_NUM_THREADS", max(1, (os.cpu_count() or 1) // _WORKER_PROCESSES))),  # 算子内并行线程数 (ONNX Runtime共用)
+    "num_interop_threads": 2,       # 算子间并行线程数
+    "cudnn_benchmark": True         # cuDNN按输入形状自动选择最快算法
 }
\ No newline at end of file
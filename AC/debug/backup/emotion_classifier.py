@@ -25,16 +25,19 @@ warnings.filterwarnings("ignore")
 
 try:
     from .config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG
-    from .emotion_mapper import GoEmotionsMapper
+    from .emotion_mapper import get_shared_mapper
 except ImportError:
     from config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG
-    from emotion_mapper import GoEmotionsMapper
+    from emotion_mapper import get_shared_mapper
 
 logger = logging.getLogger(__name__)
 
 class EmotionClassifier(nn.Module):
     """基于xlm-roberta的情感分类器"""
     
+    # 情绪名数组，供按下标批量取名
+    _emotion_names_arr = np.asarray(COWEN_KELTNER_EMOTIONS)
+    
     def __init__(self, model_name: str = None, num_labels: int = 27, load_pretrained: bool = True):
         """
         初始化情感分类器
@@ -59,7 +62,7 @@ class EmotionClassifier(nn.Module):
             self._load_pretrained_model()
         
         # 初始化映射器
-        self.mapper = GoEmotionsMapper()
+        self.mapper = get_shared_mapper()
         
         logger.info("✅ 情感分类器初始化完成")
     
@@ -164,7 +167,7 @@ class EmotionClassifier(nn.Module):
             inputs = {k: v.to(self.device) for k, v in inputs.items()}
             
             # 模型推理
-            with torch.no_grad():
+            with torch.inference_mode():
                 outputs = self.model(**inputs)
                 logits = outputs.logits
                 
@@ -176,12 +179,9 @@ class EmotionClassifier(nn.Module):
                 logger.error(f"❌ 模型输出维度错误: 期望27维，实际{len(probabilities)}维")
                 probabilities = np.zeros(27, dtype=np.float32)
             
-            # 应用置信度阈值
+            # 应用置信度阈值 (sigmoid输出已在[0, 1]内，原地乘以掩码)
             threshold = INFERENCE_CONFIG["confidence_threshold"]
-            probabilities = np.where(probabilities > threshold, probabilities, 0.0)
-            
-            # 归一化到[0, 1]
-            probabilities = np.clip(probabilities, 0, 1)
+            np.multiply(probabilities, probabilities > threshold, out=probabilities)
             
             if return_dict:
                 return self.mapper.map_ck_vector_to_dict(probabilities)
@@ -229,7 +229,7 @@ class EmotionClassifier(nn.Module):
                 inputs = {k: v.to(self.device) for k, v in inputs.items()}
                 
                 # 批量推理
-                with torch.no_grad():
+                with torch.inference_mode():
                     outputs = self.model(**inputs)
                     logits = outputs.logits
                     
@@ -244,10 +244,9 @@ class EmotionClassifier(nn.Module):
             # 合并结果
             all_results = np.vstack(results)
             
-            # 应用阈值和归一化
+            # 应用阈值 (sigmoid输出已在[0, 1]内，原地乘以掩码)
             threshold = INFERENCE_CONFIG["confidence_threshold"]
-            all_results = np.where(all_results > threshold, all_results, 0.0)
-            all_results = np.clip(all_results, 0, 1)
+            np.multiply(all_results, all_results > threshold, out=all_results)
             
             logger.info(f"✅ 批量预测完成: {all_results.shape}")
             return all_results.astype(np.float32)
@@ -294,10 +293,12 @@ class EmotionClassifier(nn.Module):
                 for i, emotion in enumerate(self.emotion_names)
             }
             
-            # 最常见的主导情绪
-            dominant_emotions = [self.emotion_names[np.argmax(row)] for row in emotion_matrix]
-            from collections import Counter
-            stats["dominant_distribution"] = dict(Counter(dominant_emotions))
+            # 最常见的主导情绪 (按行一次argmax，np.unique计数)
+            dominant_indices = emotion_matrix.argmax(axis=1)
+            unique_indices, counts = np.unique(dominant_indices, return_counts=True)
+            stats["dominant_distribution"] = dict(zip(
+                self._emotion_names_arr[unique_indices].tolist(), counts.tolist()
+            ))
             
             # 情绪活跃度 (非零情绪的平均数量)
             active_emotions = np.sum(emotion_matrix > 0, axis=1)
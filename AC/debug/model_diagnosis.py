@@ -12,52 +12,133 @@ AC情感分析模块深度诊断脚本
 
 import sys
 import os
+import json
+import time
+import threading
 import torch
 import numpy as np
-import pandas as pd
 import logging
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import orjson  # 可选依赖，加速配置读取和报告序列化
+except ImportError:
+    orjson = None
 
 # 添加AC模块路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# AC模块配置只导入一次，失败原因留给配置一致性检查报告
+try:
+    from config import MODEL_CONFIG, COWEN_KELTNER_EMOTIONS, MODEL_PATHS
+    CONFIG_IMPORT_ERROR = None
+except Exception as e:
+    MODEL_CONFIG = COWEN_KELTNER_EMOTIONS = MODEL_PATHS = None
+    CONFIG_IMPORT_ERROR = str(e)
+
+# 加速器可用性只查询一次
+USE_CUDA = torch.cuda.is_available()
+USE_MPS = hasattr(torch.backends, 'mps') and torch.backends.mps.is_available()
+
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _json_default(o):
+    """NumPy数组/标量的JSON序列化回退"""
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
 class EmotionModelDiagnosis:
     """情感模型深度诊断器"""
     
+    # 推理流程测试文本
+    INFERENCE_TEST_TEXTS = [
+        "我今天很开心",
+        "I am feeling sad", 
+        "This is frustrating",
+        "",  # 空文本测试
+        "a" * 1000  # 长文本测试
+    ]
+    
+    # 输出分布分析用的多样化测试数据
+    DIVERSE_TEXTS = [
+        # 明确的情感表达
+        "I am extremely happy and joyful today!",
+        "我感到非常愤怒和生气",
+        "This makes me incredibly sad and depressed",
+        "I feel anxious and worried about tomorrow",
+        "这音乐让我感到平静和放松",
+        
+        # 混合情感
+        "I'm excited but also nervous about the presentation",
+        "Happy memories mixed with sadness",
+        
+        # 中性文本
+        "The weather is cloudy today",
+        "Please pass the salt",
+        "Technical documentation for the API",
+        
+        # 不同语言
+        "Je suis très heureux aujourd'hui",
+        "Estoy muy triste por las noticias",
+        
+        # 极端情况
+        "!!!AMAZING WONDERFUL FANTASTIC!!!",
+        "terrible awful horrible disgusting",
+        "okay fine whatever sure"
+    ]
+    
+    # 两个诊断阶段共用一次分词和前向计算
+    ALL_DIAG_TEXTS = INFERENCE_TEST_TEXTS + DIVERSE_TEXTS
+    
     def __init__(self):
         """初始化诊断器"""
         self.ac_root = Path(__file__).parent.parent
+        self.model_dir = self.ac_root / "models" / "finetuned_xlm_roberta"
         self.diagnosis_results = {}
+        self._model_config_raw = None  # config.json解析结果缓存
+        self._model_config_lock = threading.Lock()
+        self._diag_outputs = None  # ALL_DIAG_TEXTS的 (token长度列表, logits, 概率) 缓存
         
     def run_complete_diagnosis(self) -> Dict[str, Any]:
         """运行完整诊断流程"""
         logger.info("🔍 开始AC情感模型完整诊断...")
         
-        # 1. 环境和配置检查
-        self.diagnosis_results['environment'] = self._check_environment()
-        
-        # 2. 模型文件完整性检查
-        self.diagnosis_results['model_files'] = self._check_model_files()
-        
-        # 3. 配置一致性检查
-        self.diagnosis_results['config_consistency'] = self._check_config_consistency()
+        # 1-3. 环境、模型文件、配置一致性检查互不依赖 (以I/O为主)，并行执行
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            env_future = executor.submit(self._check_environment)
+            files_future = executor.submit(self._check_model_files)
+            config_future = executor.submit(self._check_config_consistency)
+            
+            self.diagnosis_results['environment'] = env_future.result()
+            self.diagnosis_results['model_files'] = files_future.result()
+            self.diagnosis_results['config_consistency'] = config_future.result()
         
+        # 4-7依赖已加载的模型并共用同一设备，顺序执行
         # 4. 模型加载和权重检查
         self.diagnosis_results['model_loading'] = self._check_model_loading()
         
-        # 5. 推理流程诊断
-        self.diagnosis_results['inference_flow'] = self._check_inference_flow()
-        
-        # 6. 输出分布分析
-        self.diagnosis_results['output_analysis'] = self._analyze_model_outputs()
-        
-        # 7. 权重和梯度分析
-        self.diagnosis_results['weight_analysis'] = self._analyze_model_weights()
+        if self.diagnosis_results['model_loading'].get('model_loading', {}).get('success'):
+            # 5. 推理流程诊断
+            self.diagnosis_results['inference_flow'] = self._check_inference_flow()
+            
+            # 6. 输出分布分析
+            self.diagnosis_results['output_analysis'] = self._analyze_model_outputs()
+            
+            # 7. 权重和梯度分析
+            self.diagnosis_results['weight_analysis'] = self._analyze_model_weights()
+        else:
+            # 模型加载失败时后续阶段无法执行，直接跳过
+            logger.warning("⚠️ 模型未加载，跳过推理、输出分布和权重分析")
+            for stage in ('inference_flow', 'output_analysis', 'weight_analysis'):
+                self.diagnosis_results[stage] = {'error': "模型未加载，已跳过"}
         
         # 8. 生成诊断报告
         report = self._generate_diagnosis_report()
@@ -71,9 +152,9 @@ class EmotionModelDiagnosis:
         env_info = {
             'python_version': sys.version,
             'torch_version': torch.__version__,
-            'cuda_available': torch.cuda.is_available(),
-            'mps_available': hasattr(torch.backends, 'mps') and torch.backends.mps.is_available(),
-            'device_count': torch.cuda.device_count() if torch.cuda.is_available() else 0
+            'cuda_available': USE_CUDA,
+            'mps_available': USE_MPS,
+            'device_count': torch.cuda.device_count() if USE_CUDA else 0
         }
         
         # 检查transformers版本
@@ -97,7 +178,7 @@ class EmotionModelDiagnosis:
         """检查模型文件完整性"""
         logger.info("📁 检查模型文件完整性...")
         
-        model_dir = self.ac_root / "models" / "finetuned_xlm_roberta"
+        model_dir = self.model_dir
         
         required_files = [
             'config.json',
@@ -107,13 +188,24 @@ class EmotionModelDiagnosis:
             'sentencepiece.bpe.model'
         ]
         
+        # 一次目录扫描获取所需文件大小，替代逐个exists()/stat()
+        required_set = set(required_files)
+        file_sizes = {}
+        try:
+            with os.scandir(model_dir) as entries:
+                for entry in entries:
+                    if entry.name in required_set and entry.is_file():
+                        file_sizes[entry.name] = entry.stat().st_size
+            directory_exists = True
+        except (FileNotFoundError, NotADirectoryError):
+            directory_exists = False
+        
         file_status = {}
         total_size = 0
         
         for filename in required_files:
-            filepath = model_dir / filename
-            if filepath.exists():
-                size = filepath.stat().st_size
+            if filename in file_sizes:
+                size = file_sizes[filename]
                 file_status[filename] = {
                     'exists': True,
                     'size_bytes': size,
@@ -125,7 +217,7 @@ class EmotionModelDiagnosis:
         
         result = {
             'model_directory': str(model_dir),
-            'directory_exists': model_dir.exists(),
+            'directory_exists': directory_exists,
             'file_status': file_status,
             'total_size_mb': round(total_size / (1024*1024), 2),
             'all_files_present': all(status['exists'] for status in file_status.values())
@@ -137,6 +229,27 @@ class EmotionModelDiagnosis:
         
         return result
     
+    def _load_model_config(self) -> Optional[Dict[str, Any]]:
+        """
+        读取模型目录下的config.json (只解析一次并缓存)
+        
+        Returns:
+            配置字典，文件不存在时返回None
+        """
+        with self._model_config_lock:
+            if self._model_config_raw is None:
+                config_path = self.model_dir / "config.json"
+                try:
+                    if orjson is not None:
+                        self._model_config_raw = orjson.loads(config_path.read_bytes())
+                    else:
+                        with open(config_path) as f:
+                            self._model_config_raw = json.load(f)
+                except FileNotFoundError:
+                    return None
+            
+            return self._model_config_raw
+    
     def _check_config_consistency(self) -> Dict[str, Any]:
         """检查配置一致性"""
         logger.info("⚙️  检查配置一致性...")
@@ -144,26 +257,24 @@ class EmotionModelDiagnosis:
         result = {}
         
         # 检查AC模块配置
-        try:
-            from config import MODEL_CONFIG, COWEN_KELTNER_EMOTIONS, MODEL_PATHS
-            result['ac_config'] = {
-                'model_name': MODEL_CONFIG['model_name'],
-                'num_labels': MODEL_CONFIG['num_labels'],
-                'max_length': MODEL_CONFIG['max_length'],
-                'ck_emotions_count': len(COWEN_KELTNER_EMOTIONS),
-                'model_path': str(MODEL_PATHS['finetuned_model'])
-            }
-        except Exception as e:
-            result['ac_config_error'] = str(e)
+        if CONFIG_IMPORT_ERROR is not None:
+            result['ac_config_error'] = CONFIG_IMPORT_ERROR
+        else:
+            try:
+                result['ac_config'] = {
+                    'model_name': MODEL_CONFIG['model_name'],
+                    'num_labels': MODEL_CONFIG['num_labels'],
+                    'max_length': MODEL_CONFIG['max_length'],
+                    'ck_emotions_count': len(COWEN_KELTNER_EMOTIONS),
+                    'model_path': str(MODEL_PATHS['finetuned_model'])
+                }
+            except Exception as e:
+                result['ac_config_error'] = str(e)
         
         # 检查实际模型配置
         try:
-            import json
-            model_config_path = self.ac_root / "models" / "finetuned_xlm_roberta" / "config.json"
-            if model_config_path.exists():
-                with open(model_config_path) as f:
-                    model_config = json.load(f)
-                
+            model_config = self._load_model_config()
+            if model_config is not None:
                 result['model_config'] = {
                     'architectures': model_config.get('architectures', []),
                     'num_labels': len(model_config.get('id2label', {})),
@@ -196,11 +307,12 @@ class EmotionModelDiagnosis:
         try:
             # 尝试加载分词器
             from transformers import AutoTokenizer
-            model_path = self.ac_root / "models" / "finetuned_xlm_roberta"
+            model_path = self.model_dir
             
-            tokenizer = AutoTokenizer.from_pretrained(str(model_path))
+            tokenizer = AutoTokenizer.from_pretrained(str(model_path), use_fast=True)
             result['tokenizer_loading'] = {
                 'success': True,
+                'is_fast': tokenizer.is_fast,
                 'vocab_size': tokenizer.vocab_size,
                 'model_max_length': tokenizer.model_max_length
             }
@@ -215,13 +327,27 @@ class EmotionModelDiagnosis:
         
         try:
             # 尝试加载模型
-            from transformers import AutoModelForSequenceClassification
-            model_path = self.ac_root / "models" / "finetuned_xlm_roberta"
+            from transformers import AutoConfig, AutoModelForSequenceClassification
+            model_path = self.model_dir
+            
+            # 复用已解析的config.json，from_pretrained不再重复读取
+            model_config = self._load_model_config()
+            config_kwargs = {'config': AutoConfig.for_model(**model_config)} if model_config else {}
             
-            model = AutoModelForSequenceClassification.from_pretrained(str(model_path))
+            # low_cpu_mem_usage: 在meta设备上构建骨架后直接assign权重 (safetensors为mmap读取)，
+            # 避免先随机初始化再整份拷贝state dict造成的双倍峰值内存
+            load_start = time.perf_counter()
+            model = AutoModelForSequenceClassification.from_pretrained(
+                str(model_path),
+                low_cpu_mem_usage=True,
+                **config_kwargs
+            )
+            load_time = time.perf_counter() - load_start
             
             result['model_loading'] = {
                 'success': True,
+                'load_time_seconds': round(load_time, 3),
+                'low_cpu_mem_usage': True,
                 'num_parameters': sum(p.numel() for p in model.parameters()),
                 'model_dtype': str(model.dtype),
                 'classifier_out_features': model.classifier.out_features if hasattr(model, 'classifier') else 'N/A'
@@ -238,10 +364,31 @@ class EmotionModelDiagnosis:
             
             logger.info("   ✅ 模型加载成功")
             logger.info(f"   参数数量: {result['model_loading']['num_parameters']:,}")
+            logger.info(f"   加载耗时: {load_time:.2f}s")
             
-            # 保存模型引用用于后续测试
+            # 保持FP32: 权重统计 (零值比例、std、范数) 和输出塌缩检查都依赖checkpoint的原始精度，
+            # 半精度会把极小权重舍入为零并掩盖输出差异；CPU上无BF16硬件支持时也不会更快
+            if USE_CUDA or USE_MPS:
+                self.device = torch.device("cuda" if USE_CUDA else "mps")
+                model = model.to(self.device)
+            else:
+                self.device = torch.device("cpu")
+            result['model_loading']['inference_dtype'] = str(model.dtype)
+            result['model_loading']['inference_device'] = str(self.device)
+            logger.info(f"   推理精度: {model.dtype} ({self.device})")
+            
+            # 保存模型引用用于后续测试 (加载后切换一次推理模式即可)
+            model.eval()
             self.loaded_model = model
             self.loaded_tokenizer = tokenizer
+            # 预先绑定诊断用的分词参数，各阶段直接调用self._tok(texts)
+            self._tok = partial(
+                tokenizer,
+                padding="longest",
+                truncation=True,
+                max_length=512,
+                return_tensors="pt"
+            )
             
         except Exception as e:
             result['model_loading'] = {
@@ -252,6 +399,67 @@ class EmotionModelDiagnosis:
         
         return result
     
+    def _forward_texts(self, texts: List[str]) -> Tuple[Dict[str, torch.Tensor], torch.Tensor]:
+        """
+        批量分词并执行一次前向计算
+        
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            (分词结果, FP32 CPU logits张量 (N, num_labels))
+        """
+        inputs = self._tok(texts) if len(texts) > 1 else self._tok(texts, padding=False)
+        
+        if self.device.type == "cuda":
+            # 锁页内存 + 异步拷贝，H2D传输与计算重叠
+            device_inputs = {k: v.pin_memory().to(self.device, non_blocking=True) for k, v in inputs.items()}
+        else:
+            device_inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        
+        with torch.inference_mode():
+            outputs = self.loaded_model(**device_inputs)
+        
+        # 统计前统一为FP32 (checkpoint本身为半精度时同样适用)
+        return inputs, outputs.logits.float().cpu()
+    
+    def _forward_diag_texts(self) -> Tuple[List[int], np.ndarray, np.ndarray]:
+        """
+        对ALL_DIAG_TEXTS执行一次分词和前向计算，结果缓存供各诊断阶段切片
+        
+        非空文本合并为一个批次；空文本单独推理，避免与长文本一同填充
+        
+        Returns:
+            (各文本token长度, logits数组 (N, num_labels), sigmoid概率数组 (N, num_labels))，
+            顺序与ALL_DIAG_TEXTS一致
+        """
+        if self._diag_outputs is None:
+            texts = self.ALL_DIAG_TEXTS
+            lengths = [0] * len(texts)
+            all_logits = None
+            
+            non_empty = [i for i, text in enumerate(texts) if text]
+            empty = [i for i, text in enumerate(texts) if not text]
+            
+            for indices in (non_empty, empty):
+                if not indices:
+                    continue
+                
+                inputs, logits = self._forward_texts([texts[i] for i in indices])
+                if all_logits is None:
+                    all_logits = torch.empty((len(texts), logits.shape[1]), dtype=logits.dtype)
+                
+                # 各批次结果直接写入预分配的 (N, num_labels) 张量
+                all_logits[indices] = logits
+                for i, length in zip(indices, inputs['attention_mask'].sum(dim=1).tolist()):
+                    lengths[i] = int(length)
+            
+            # 全部文本统一做一次sigmoid，两个诊断阶段共用
+            probs = torch.sigmoid(all_logits)
+            self._diag_outputs = (lengths, all_logits.numpy(), probs.numpy())
+        
+        return self._diag_outputs
+    
     def _check_inference_flow(self) -> Dict[str, Any]:
         """检查推理流程"""
         logger.info("🧠 检查推理流程...")
@@ -262,58 +470,48 @@ class EmotionModelDiagnosis:
             result['error'] = "模型或分词器未加载"
             return result
         
-        test_texts = [
-            "我今天很开心",
-            "I am feeling sad", 
-            "This is frustrating",
-            "",  # 空文本测试
-            "a" * 1000  # 长文本测试
-        ]
-        
-        inference_results = []
+        test_texts = self.INFERENCE_TEST_TEXTS
         
-        for i, text in enumerate(test_texts):
-            try:
-                # 分词
-                inputs = self.loaded_tokenizer(
-                    text,
-                    padding=True,
-                    truncation=True,
-                    max_length=512,
-                    return_tensors="pt"
-                )
-                
-                # 推理
-                self.loaded_model.eval()
-                with torch.no_grad():
-                    outputs = self.loaded_model(**inputs)
-                    logits = outputs.logits
-                    probs = torch.sigmoid(logits)
-                
+        try:
+            lengths, logits_np, probs_np = self._forward_diag_texts()
+            logits_np = logits_np[:len(test_texts)]
+            probs_np = probs_np[:len(test_texts)]
+            
+            # 按行一次性归约 (std与torch默认一致，使用无偏估计)
+            num_labels = logits_np.shape[1]
+            
+            logits_mean = logits_np.mean(axis=1)
+            logits_std = logits_np.std(axis=1, ddof=1)
+            logits_min = logits_np.min(axis=1)
+            logits_max = logits_np.max(axis=1)
+            probs_sum = probs_np.sum(axis=1)
+            probs_std = probs_np.std(axis=1, ddof=1)
+            active_outputs = np.count_nonzero(probs_np > 0.1, axis=1)
+            
+            inference_results = []
+            for i, text in enumerate(test_texts):
                 # 分析输出
-                test_result = {
-                    'text_length': len(text),
-                    'input_ids_shape': inputs['input_ids'].shape,
-                    'logits_shape': logits.shape,
-                    'logits_mean': float(logits.mean()),
-                    'logits_std': float(logits.std()),
-                    'logits_min': float(logits.min()),
-                    'logits_max': float(logits.max()),
-                    'probs_mean': float(probs.mean()),
-                    'probs_std': float(probs.std()),
-                    'probs_sum': float(probs.sum()),
-                    'active_outputs': int(torch.sum(probs > 0.1)),
-                    'logits_sample': logits[0][:5].tolist(),  # 前5个logits
-                    'probs_sample': probs[0][:5].tolist()    # 前5个概率
-                }
-                
-                inference_results.append(test_result)
-                
-            except Exception as e:
                 inference_results.append({
                     'text_length': len(text),
-                    'error': str(e)
+                    'input_ids_shape': (1, lengths[i]),
+                    'logits_shape': (1, num_labels),
+                    'logits_mean': float(logits_mean[i]),
+                    'logits_std': float(logits_std[i]),
+                    'logits_min': float(logits_min[i]),
+                    'logits_max': float(logits_max[i]),
+                    'probs_mean': float(probs_sum[i] / num_labels),
+                    'probs_std': float(probs_std[i]),
+                    'probs_sum': float(probs_sum[i]),
+                    'active_outputs': int(active_outputs[i]),
+                    'logits_sample': logits_np[i, :5].tolist(),  # 前5个logits
+                    'probs_sample': probs_np[i, :5].tolist()    # 前5个概率
                 })
+            
+        except Exception as e:
+            inference_results = [
+                {'text_length': len(text), 'error': str(e)}
+                for text in test_texts
+            ]
         
         result['test_results'] = inference_results
         
@@ -347,96 +545,63 @@ class EmotionModelDiagnosis:
             result['error'] = "模型或分词器未加载"
             return result
         
-        # 准备多样化测试数据
-        diverse_texts = [
-            # 明确的情感表达
-            "I am extremely happy and joyful today!",
-            "我感到非常愤怒和生气",
-            "This makes me incredibly sad and depressed",
-            "I feel anxious and worried about tomorrow",
-            "这音乐让我感到平静和放松",
-            
-            # 混合情感
-            "I'm excited but also nervous about the presentation",
-            "Happy memories mixed with sadness",
-            
-            # 中性文本
-            "The weather is cloudy today",
-            "Please pass the salt",
-            "Technical documentation for the API",
-            
-            # 不同语言
-            "Je suis très heureux aujourd'hui",
-            "Estoy muy triste por las noticias",
-            
-            # 极端情况
-            "!!!AMAZING WONDERFUL FANTASTIC!!!",
-            "terrible awful horrible disgusting",
-            "okay fine whatever sure"
-        ]
+        diverse_texts = self.DIVERSE_TEXTS
         
-        all_outputs = []
-        all_logits = []
-        
-        self.loaded_model.eval()
-        
-        for text in diverse_texts:
-            try:
-                inputs = self.loaded_tokenizer(
-                    text,
-                    padding=True,
-                    truncation=True,
-                    max_length=512,
-                    return_tensors="pt"
-                )
-                
-                with torch.no_grad():
-                    outputs = self.loaded_model(**inputs)
-                    logits = outputs.logits[0]  # 取第一个样本
-                    probs = torch.sigmoid(logits)
-                
-                all_outputs.append(probs.numpy())
-                all_logits.append(logits.numpy())
-                
-            except Exception as e:
-                logger.warning(f"处理文本失败: {text[:30]}... -> {e}")
+        outputs_array = None
+        logits_array = None
         
-        if all_outputs:
-            outputs_array = np.array(all_outputs)  # (N, 27)
-            logits_array = np.array(all_logits)    # (N, 27)
+        try:
+            # 复用共享批次前向的结果，直接作为 (N, 27) 数组使用
+            _, logits_array, outputs_array = self._forward_diag_texts()
+            offset = len(self.INFERENCE_TEST_TEXTS)
+            logits_array = logits_array[offset:]    # (N, 27)
+            outputs_array = outputs_array[offset:]  # (N, 27)
+            
+        except Exception as e:
+            logger.warning(f"批量处理文本失败: {len(diverse_texts)}条 -> {e}")
+        
+        if outputs_array is not None:
+            # 共用的归约结果只计算一次，分布统计与异常检测复用
+            num_values = outputs_array.size
+            active_mask = outputs_array > 0.1
+            max_per_sample = outputs_array.max(axis=1)
+            global_mean = float(outputs_array.mean())
+            global_std = float(outputs_array.std())
+            zero_ratio = np.count_nonzero(outputs_array == 0) / num_values
+            logits_std = float(logits_array.std())
             
             # 分析输出分布
             result['distribution_analysis'] = {
-                'num_samples': len(all_outputs),
+                'num_samples': len(outputs_array),
                 'output_shape': outputs_array.shape,
                 
-                # 按样本分析
+                # 按样本分析 (保留NumPy数组，由报告序列化时直接输出)
                 'sample_statistics': {
-                    'mean_per_sample': outputs_array.mean(axis=1).tolist(),
-                    'std_per_sample': outputs_array.std(axis=1).tolist(),
-                    'max_per_sample': outputs_array.max(axis=1).tolist(),
-                    'active_emotions_per_sample': (outputs_array > 0.1).sum(axis=1).tolist()
+                    'mean_per_sample': outputs_array.mean(axis=1),
+                    'std_per_sample': outputs_array.std(axis=1),
+                    'max_per_sample': max_per_sample,
+                    'active_emotions_per_sample': np.count_nonzero(active_mask, axis=1)
                 },
                 
                 # 按维度分析
                 'dimension_statistics': {
-                    'mean_per_dim': outputs_array.mean(axis=0).tolist(),
-                    'std_per_dim': outputs_array.std(axis=0).tolist(),
-                    'activation_rate_per_dim': (outputs_array > 0.1).mean(axis=0).tolist()
+                    'mean_per_dim': outputs_array.mean(axis=0),
+                    'std_per_dim': outputs_array.std(axis=0),
+                    'activation_rate_per_dim': np.count_nonzero(active_mask, axis=0) / len(outputs_array)
                 },
                 
                 # 整体统计
                 'overall_statistics': {
-                    'global_mean': float(outputs_array.mean()),
-                    'global_std': float(outputs_array.std()),
-                    'zero_ratio': float((outputs_array == 0).mean()),
-                    'low_activation_ratio': float((outputs_array < 0.01).mean())
+                    'global_mean': global_mean,
+                    'global_std': global_std,
+                    'zero_ratio': zero_ratio,
+                    'low_activation_ratio': np.count_nonzero(outputs_array < 0.01) / num_values
                 },
                 
                 # logits分析
                 'logits_statistics': {
                     'mean': float(logits_array.mean()),
-                    'std': float(logits_array.std()),
+                    'std': logits_std,
                     'min': float(logits_array.min()),
                     'max': float(logits_array.max())
                 }
@@ -445,13 +610,13 @@ class EmotionModelDiagnosis:
             # 检测异常模式
             result['anomaly_detection'] = {
                 'all_outputs_identical': np.allclose(outputs_array, outputs_array[0], atol=1e-6),
-                'extremely_low_variance': outputs_array.std() < 1e-4,
-                'dominated_by_zeros': (outputs_array == 0).mean() > 0.9,
-                'single_dimension_dominance': outputs_array.max(axis=1).mean() > 0.9,
-                'logits_collapsed': abs(logits_array.std()) < 0.1
+                'extremely_low_variance': global_std < 1e-4,
+                'dominated_by_zeros': zero_ratio > 0.9,
+                'single_dimension_dominance': float(max_per_sample.mean()) > 0.9,
+                'logits_collapsed': abs(logits_std) < 0.1
             }
             
-            logger.info(f"   分析样本数: {len(all_outputs)}")
+            logger.info(f"   分析样本数: {len(outputs_array)}")
             logger.info(f"   全局均值: {result['distribution_analysis']['overall_statistics']['global_mean']:.4f}")
             logger.info(f"   全局标准差: {result['distribution_analysis']['overall_statistics']['global_std']:.4f}")
             
@@ -464,6 +629,11 @@ class EmotionModelDiagnosis:
         
         return result
     
+    @staticmethod
+    def _param_to_numpy(param: torch.Tensor) -> np.ndarray:
+        """参数转为FP32 NumPy数组 (一次设备到主机拷贝)"""
+        return param.detach().float().cpu().numpy()
+    
     def _analyze_model_weights(self) -> Dict[str, Any]:
         """分析模型权重"""
         logger.info("⚖️  分析模型权重...")
@@ -480,43 +650,48 @@ class EmotionModelDiagnosis:
                 classifier = self.loaded_model.classifier
                 
                 if hasattr(classifier, 'weight'):
-                    weight = classifier.weight.data
-                    bias = classifier.bias.data if hasattr(classifier, 'bias') else None
+                    # 每个参数只做一次设备到主机的拷贝，统计量均在NumPy副本上计算
+                    weight = self._param_to_numpy(classifier.weight)
+                    bias = self._param_to_numpy(classifier.bias) if getattr(classifier, 'bias', None) is not None else None
+                    
+                    weight_mean = float(weight.mean())
+                    weight_std = float(weight.std(ddof=1))
                     
                     result['classifier_weights'] = {
                         'weight_shape': list(weight.shape),
-                        'weight_mean': float(weight.mean()),
-                        'weight_std': float(weight.std()),
+                        'weight_mean': weight_mean,
+                        'weight_std': weight_std,
                         'weight_min': float(weight.min()),
                         'weight_max': float(weight.max()),
-                        'weight_zeros': int((weight == 0).sum()),
-                        'weight_norm': float(weight.norm()),
+                        'weight_zeros': int(np.count_nonzero(weight == 0)),
+                        'weight_norm': float(np.linalg.norm(weight)),
                     }
                     
                     if bias is not None:
                         result['classifier_bias'] = {
                             'bias_shape': list(bias.shape),
                             'bias_mean': float(bias.mean()),
-                            'bias_std': float(bias.std()),
+                            'bias_std': float(bias.std(ddof=1)),
                             'bias_min': float(bias.min()),
                             'bias_max': float(bias.max())
                         }
                     
                     # 检查权重是否被正确初始化/微调
                     result['weight_analysis'] = {
-                        'weights_initialized': not torch.allclose(weight, torch.zeros_like(weight)),
-                        'reasonable_scale': 0.001 < weight.std() < 10.0,
-                        'symmetric_distribution': abs(weight.mean()) < weight.std(),
+                        'weights_initialized': not np.allclose(weight, 0.0),
+                        'reasonable_scale': 0.001 < weight_std < 10.0,
+                        'symmetric_distribution': abs(weight_mean) < weight_std,
                     }
             
-            # 检查一些关键层的权重统计
+            # 检查一些关键层的权重统计 (先按名称过滤，只拷贝选中的参数)
             layer_stats = {}
             for name, param in self.loaded_model.named_parameters():
                 if 'classifier' in name or 'pooler' in name:
+                    values = self._param_to_numpy(param)
                     layer_stats[name] = {
                         'shape': list(param.shape),
-                        'mean': float(param.mean()),
-                        'std': float(param.std()),
+                        'mean': float(values.mean()),
+                        'std': float(values.std(ddof=1)),
                         'requires_grad': param.requires_grad
                     }
             
@@ -633,9 +808,16 @@ class EmotionModelDiagnosis:
         """保存诊断报告"""
         output_path = Path(__file__).parent / filename
         
-        import json
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            # orjson直接序列化NumPy数组和标量
+            output_path.write_bytes(orjson.dumps(
+                report,
+                default=_json_default,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2, default=_json_default)
         
         logger.info(f"📄 诊断报告已保存: {output_path}")
 
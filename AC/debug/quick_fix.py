@@ -7,19 +7,101 @@ AC模块快速修复脚本
 2. python debug/quick_fix.py --fix        # 应用修复
 3. python debug/quick_fix.py --test       # 测试修复结果
 4. python debug/quick_fix.py --restore    # 恢复原始文件
+5. python debug/quick_fix.py --clear-cache  # 清除基础分词器下载缓存
 """
 
 import argparse
+import functools
+import hashlib
+import os
 import sys
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Set, Tuple
+
+# 路径只解析一次，各步骤共用
+AC_ROOT = Path(__file__).resolve().parent.parent
+MODEL_DIR = AC_ROOT / "models" / "finetuned_xlm_roberta"
+BACKUP_DIR = AC_ROOT / "debug" / "backup"
+
+BASE_TOKENIZER_NAME = "xlm-roberta-base"
+BASE_TOKENIZER_FILES = [
+    "tokenizer.json",
+    "tokenizer_config.json",
+    "sentencepiece.bpe.model",
+    "special_tokens_map.json"
+]
+
+# 基础分词器下载到本脚本专用的缓存目录，重复--fix时直接命中本地文件；
+# 不修改HF_HOME，--clear-cache也只会删除这个目录，不影响用户共享的HF缓存
+HF_CACHE_DIR = Path.home() / ".cache" / "hf_ac_fix"
+
+@functools.lru_cache(maxsize=None)
+def _fetch_base_tokenizer_files() -> Path:
+    """
+    获取基础模型分词器文件所在的本地快照目录
+    
+    只下载分词器相关文件，不构建分词器对象；进程内缓存，优先读取本地HF缓存，缺失时再联网下载
+    """
+    from huggingface_hub import snapshot_download
+    try:
+        return Path(snapshot_download(BASE_TOKENIZER_NAME, allow_patterns=BASE_TOKENIZER_FILES,
+                                      cache_dir=HF_CACHE_DIR, local_files_only=True))
+    except (OSError, ValueError):
+        return Path(snapshot_download(BASE_TOKENIZER_NAME, allow_patterns=BASE_TOKENIZER_FILES,
+                                      cache_dir=HF_CACHE_DIR))
+
+def clear_tokenizer_cache():
+    """清除基础分词器的进程内缓存和本地下载缓存"""
+    _fetch_base_tokenizer_files.cache_clear()
+    
+    repo_cache = HF_CACHE_DIR / f"models--{BASE_TOKENIZER_NAME.replace('/', '--')}"
+    if repo_cache.exists():
+        shutil.rmtree(repo_cache)
+        print(f"✅ 已清除分词器缓存: {repo_cache}")
+    else:
+        print("💡 未找到分词器缓存")
+
+def _file_fingerprint(path: Path) -> str:
+    """文件内容的blake2b摘要"""
+    return hashlib.blake2b(path.read_bytes()).hexdigest()
+
+def _existing_files(directory: Path, names: List[str]) -> Set[str]:
+    """一次目录扫描，返回names中实际存在的文件名"""
+    wanted = set(names)
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries if entry.name in wanted and entry.is_file()}
+    except FileNotFoundError:
+        return set()
+
+def _copy_all(jobs: List[Tuple[str, Path, Path]]) -> List[str]:
+    """
+    并行复制多个文件 (相互独立，以I/O为主)
+    
+    备份与恢复都使用shutil.copy2，保留修改时间和权限位 (Linux上同样走sendfile快速路径)
+    
+    Args:
+        jobs: (文件名, 源路径, 目标路径) 列表，源文件须已确认存在
+        
+    Returns:
+        按jobs顺序排列的已复制文件名
+    """
+    if not jobs:
+        return []
+    
+    def copy_one(job: Tuple[str, Path, Path]) -> str:
+        name, src, dst = job
+        shutil.copy2(str(src), str(dst))
+        return name
+    
+    with ThreadPoolExecutor(max_workers=min(8, len(jobs))) as executor:
+        return list(executor.map(copy_one, jobs))
 
 def backup_files():
     """备份原始文件"""
-    ac_root = Path(__file__).parent.parent
-    model_dir = ac_root / "models" / "finetuned_xlm_roberta"
-    backup_dir = ac_root / "debug" / "backup"
-    backup_dir.mkdir(exist_ok=True)
+    BACKUP_DIR.mkdir(exist_ok=True)
     
     files_to_backup = [
         "emotion_classifier.py",
@@ -33,49 +115,61 @@ def backup_files():
     
     print("📦 备份原始文件...")
     
-    # 备份AC模块文件
-    for file in files_to_backup:
-        src = ac_root / file
-        dst = backup_dir / file
-        if src.exists():
-            shutil.copy2(src, dst)
-            print(f"✅ 已备份: {file}")
-    
-    # 备份模型文件
-    for file in model_files_to_backup:
-        src = model_dir / file
-        dst = backup_dir / file
-        if src.exists():
-            shutil.copy2(src, dst)
-            print(f"✅ 已备份: {file}")
+    # AC模块文件和模型文件一起并行备份，完成后按原顺序输出
+    ac_existing = _existing_files(AC_ROOT, files_to_backup)
+    model_existing = _existing_files(MODEL_DIR, model_files_to_backup)
+    jobs = [(file, AC_ROOT / file, BACKUP_DIR / file) for file in files_to_backup if file in ac_existing]
+    jobs += [(file, MODEL_DIR / file, BACKUP_DIR / file) for file in model_files_to_backup if file in model_existing]
+    
+    for file in _copy_all(jobs):
+        print(f"✅ 已备份: {file}")
     
     print("✅ 备份完成")
 
 def apply_fix():
     """应用修复"""
-    ac_root = Path(__file__).parent.parent
-    
     print("🔧 应用版本兼容修复...")
     
     # 1. 重新生成兼容的分词器
     try:
-        from transformers import AutoTokenizer
-        model_dir = ac_root / "models" / "finetuned_xlm_roberta"
+        tokenizer_file = MODEL_DIR / "tokenizer.json"
+        fingerprint_file = BACKUP_DIR / ".tokenizer_fingerprint"
         
-        # 使用基础模型分词器
-        tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-base")
-        tokenizer.save_pretrained(str(model_dir))
-        print("✅ 分词器已修复")
+        # 上次修复写入的分词器未被改动时跳过下载和重新保存
+        if (tokenizer_file.exists() and fingerprint_file.exists()
+                and _file_fingerprint(tokenizer_file) == fingerprint_file.read_text().strip()):
+            print("✅ 分词器已是兼容版本，跳过")
+        else:
+            # 使用基础模型分词器: 快照文件齐全时直接复制，跳过分词器构建和重新序列化
+            snapshot_dir = _fetch_base_tokenizer_files()
+            missing_files = [file for file in BASE_TOKENIZER_FILES if not (snapshot_dir / file).exists()]
+            
+            if missing_files:
+                # 基础模型仓库不一定提供tokenizer_config.json等文件，
+                # 此时由save_pretrained重新生成全部分词器文件，覆盖旧版本不兼容的配置
+                from transformers import AutoTokenizer
+                print(f"💡 快照中缺少 {missing_files}，重新生成分词器文件")
+                tokenizer = AutoTokenizer.from_pretrained(BASE_TOKENIZER_NAME, cache_dir=str(HF_CACHE_DIR))
+                tokenizer.save_pretrained(str(MODEL_DIR))
+            else:
+                for file in BASE_TOKENIZER_FILES:
+                    shutil.copy2(str(snapshot_dir / file), str(MODEL_DIR / file))
+            BACKUP_DIR.mkdir(exist_ok=True)
+            fingerprint_file.write_text(_file_fingerprint(tokenizer_file))
+            print("✅ 分词器已修复")
     except Exception as e:
         print(f"❌ 分词器修复失败: {e}")
     
     # 2. 替换为兼容版emotion_classifier
     try:
-        compatible_file = ac_root / "debug" / "emotion_classifier_compatible.py"
-        target_file = ac_root / "emotion_classifier.py"
+        compatible_file = AC_ROOT / "debug" / "emotion_classifier_compatible.py"
+        target_file = AC_ROOT / "emotion_classifier.py"
         
         if compatible_file.exists():
-            shutil.copy2(compatible_file, target_file)
+            # 先写临时文件再原子替换，中途失败不会留下半个emotion_classifier.py
+            tmp_file = target_file.with_suffix(".py.tmp")
+            shutil.copy2(str(compatible_file), str(tmp_file))
+            os.replace(str(tmp_file), str(target_file))
             print("✅ 情感分类器已替换为兼容版")
     except Exception as e:
         print(f"❌ 分类器替换失败: {e}")
@@ -87,8 +181,9 @@ def test_fix():
     print("🧪 测试修复结果...")
     
     try:
-        # 导入并测试兼容版分类器
-        sys.path.insert(0, str(Path(__file__).parent.parent))
+        # 导入并测试兼容版分类器 (numpy等重依赖只在测试时导入，--backup/--restore保持轻量)
+        import numpy as np
+        sys.path.insert(0, str(AC_ROOT))
         from emotion_classifier import CompatibleEmotionClassifier
         
         # 创建分类器实例
@@ -110,10 +205,10 @@ def test_fix():
             ]
             
             print("\n🧪 测试预测:")
-            for text in test_texts:
-                result = classifier.predict_single(text)
-                active_emotions = sum(1 for x in result if x > 0.1)
-                print(f"文本: '{text}' -> 活跃情绪数: {active_emotions}, 向量和: {sum(result):.3f}")
+            vectors = classifier.predict_batch(test_texts)
+            for text, result in zip(test_texts, vectors):
+                active_emotions = int(np.count_nonzero(result > 0.1))
+                print(f"文本: '{text}' -> 活跃情绪数: {active_emotions}, 向量和: {float(result.sum()):.3f}")
             
             print("✅ 功能测试通过")
         else:
@@ -126,10 +221,7 @@ def restore_files():
     """恢复原始文件"""
     print("🔄 恢复原始文件...")
     
-    ac_root = Path(__file__).parent.parent
-    backup_dir = ac_root / "debug" / "backup"
-    
-    if not backup_dir.exists():
+    if not BACKUP_DIR.exists():
         print("❌ 未找到备份目录")
         return
     
@@ -138,12 +230,11 @@ def restore_files():
         "inference_api.py"
     ]
     
-    for file in files_to_restore:
-        src = backup_dir / file
-        dst = ac_root / file
-        if src.exists():
-            shutil.copy2(src, dst)
-            print(f"✅ 已恢复: {file}")
+    backup_existing = _existing_files(BACKUP_DIR, files_to_restore)
+    jobs = [(file, BACKUP_DIR / file, AC_ROOT / file) for file in files_to_restore if file in backup_existing]
+    
+    for file in _copy_all(jobs):
+        print(f"✅ 已恢复: {file}")
     
     print("✅ 恢复完成")
 
@@ -154,9 +245,13 @@ def main():
     parser.add_argument("--test", action="store_true", help="测试修复结果")
     parser.add_argument("--restore", action="store_true", help="恢复原始文件")
     parser.add_argument("--all", action="store_true", help="执行完整修复流程")
+    parser.add_argument("--clear-cache", action="store_true", help="清除基础分词器下载缓存")
     
     args = parser.parse_args()
     
+    if args.clear_cache:
+        clear_tokenizer_cache()
+    
     if args.all:
         backup_files()
         apply_fix()
@@ -169,7 +264,7 @@ def main():
         test_fix()
     elif args.restore:
         restore_files()
-    else:
+    elif not args.clear_cache:
         parser.print_help()
 
 if __name__ == "__main__":
@@ -7,8 +7,8 @@
 
 import sys
 import os
-import numpy as np
 import logging
+from functools import lru_cache
 from pathlib import Path
 
 # 添加AC模块路径
@@ -17,27 +17,40 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1)
+def _get_classifier():
+    """兼容版分类器 (进程内只构建并加载一次，供各测试复用)"""
+    from emotion_classifier import CompatibleEmotionClassifier
+    
+    classifier = CompatibleEmotionClassifier(load_pretrained=False)
+    
+    # 尝试加载微调模型 (状态只在加载后查询一次)
+    print("\n📥 加载微调模型...")
+    classifier.load_finetuned_model_safe()
+    
+    return classifier
+
 def test_fixed_classifier():
-    """测试修复后的分类器"""
+    """
+    测试修复后的分类器
+    
+    Returns:
+        (测试是否通过, 已加载的分类器实例或None)
+    """
     print("🧪 测试修复后的AC情感分析模块")
     print("="*60)
     
+    classifier = None
+    
     try:
-        # 导入修复后的分类器
+        # 导入修复后的分类器 (重依赖在测试函数内导入)
+        import numpy as np
         from emotion_classifier import CompatibleEmotionClassifier
         print("✅ 成功导入兼容版分类器")
         
         # 创建分类器实例
         print("\n🔧 初始化分类器...")
-        classifier = CompatibleEmotionClassifier(load_pretrained=False)
-        
-        # 显示初始状态
-        info = classifier.get_model_info()
-        print(f"初始状态: {info}")
-        
-        # 尝试加载微调模型
-        print("\n📥 加载微调模型...")
-        success = classifier.load_finetuned_model_safe()
+        classifier = _get_classifier()
         
         # 显示加载后状态
         info = classifier.get_model_info()
@@ -81,15 +94,15 @@ def test_fixed_classifier():
             all_results_identical = True
             first_result = None
             
-            for i, case in enumerate(test_cases, 1):
+            # 全部测试文本一次批量预测
+            all_vectors = classifier.predict_batch([case['text'] for case in test_cases])
+            
+            for i, (case, emotion_vector) in enumerate(zip(test_cases, all_vectors), 1):
                 text = case['text']
                 expected = case['expected_emotions']
                 
                 print(f"\n测试 {i}: {text}")
                 
-                # 获取情感向量
-                emotion_vector = classifier.predict_single(text)
-                
                 # 计算统计信息
                 total_intensity = float(np.sum(emotion_vector))
                 max_intensity = float(np.max(emotion_vector))
@@ -126,17 +139,11 @@ def test_fixed_classifier():
             if all_results_identical:
                 print("❌ 严重问题: 所有输入产生相同输出")
                 print("   这表明模型权重未正确加载或存在其他严重问题")
-                return False
+                return False, classifier
             else:
                 print("✅ 正常: 不同输入产生不同输出")
             
-            # 检查输出范围
-            all_vectors = []
-            for case in test_cases:
-                vec = classifier.predict_single(case['text'])
-                all_vectors.append(vec)
-            
-            all_vectors = np.array(all_vectors)
+            # 检查输出范围 (复用上面的预测结果)
             overall_std = np.std(all_vectors)
             overall_mean = np.mean(all_vectors)
             
@@ -151,27 +158,33 @@ def test_fixed_classifier():
                 print("⚡ 一般: 输出多样性较低但可接受")
             
             print("\n✅ 情感分析功能测试完成")
-            return True
+            return True, classifier
             
         else:
             print("❌ 模型或分词器加载失败")
-            return False
+            return False, classifier
             
     except Exception as e:
         print(f"❌ 测试失败: {e}")
         import traceback
         traceback.print_exc()
-        return False
+        return False, classifier
 
-def test_api_integration():
-    """测试API集成"""
+def test_api_integration(classifier=None):
+    """
+    测试API集成
+    
+    Args:
+        classifier: 已加载的分类器，提供时直接复用，避免重复加载模型权重
+    """
     print("\n🌉 测试API集成...")
     
     try:
+        import numpy as np
         from inference_api import EmotionInferenceAPI
         
         # 创建API实例
-        api = EmotionInferenceAPI(load_finetuned=True)
+        api = EmotionInferenceAPI(load_finetuned=True, classifier=classifier)
         
         # 获取状态
         status = api.get_api_status()
@@ -207,10 +220,10 @@ def main():
     print("="*60)
     
     # 测试1: 基础分类器功能
-    classifier_ok = test_fixed_classifier()
+    classifier_ok, classifier = test_fixed_classifier()
     
-    # 测试2: API集成
-    api_ok = test_api_integration()
+    # 测试2: API集成 (复用测试1已加载的分类器)
+    api_ok = test_api_integration(classifier)
     
     # 总结
     print("\n" + "="*60)
@@ -15,11 +15,21 @@ AC模块版本兼容性问题诊断和修复脚本
 
 import sys
 import os
-import torch
 import json
+import math
+import struct
+import functools
+import hashlib
 import logging
+import shutil
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import orjson  # 可选依赖，加速配置读取和报告序列化
+except ImportError:
+    orjson = None
 
 # 添加AC模块路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -27,6 +37,59 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=8)
+def _cached_tokenizer(name: str):
+    """按名称缓存的AutoTokenizer，同一进程内重复诊断不再重新读取文件或请求Hub"""
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(name)
+
+@functools.lru_cache(maxsize=8)
+def _cached_config(name: str):
+    """按名称缓存的AutoConfig"""
+    from transformers import AutoConfig
+    return AutoConfig.from_pretrained(name)
+
+def _write_if_changed(path: Path, content: bytes) -> bool:
+    """
+    内容与现有文件不同时才写入 (按blake2b摘要比较)
+    
+    避免重复运行时无谓地重写文件并使__pycache__失效
+    
+    Returns:
+        是否实际写入
+    """
+    if path.exists() and hashlib.blake2b(path.read_bytes()).digest() == hashlib.blake2b(content).digest():
+        return False
+    path.write_bytes(content)
+    return True
+
+def _read_safetensors_shapes(model_dir: Path) -> Optional[Dict[str, List[int]]]:
+    """
+    从safetensors文件头读取全部张量形状 (支持分片权重)
+    
+    文件头为8字节小端长度 + JSON元数据，只读取这部分，不触碰任何权重数据
+    
+    Returns:
+        张量名 -> 形状；目录中没有safetensors权重时返回None
+    """
+    index_file = model_dir / "model.safetensors.index.json"
+    if index_file.exists():
+        shard_names = sorted(set(json.loads(index_file.read_bytes())["weight_map"].values()))
+    elif (model_dir / "model.safetensors").exists():
+        shard_names = ["model.safetensors"]
+    else:
+        return None
+    
+    shapes = {}
+    for shard_name in shard_names:
+        with open(model_dir / shard_name, "rb") as f:
+            header_size, = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_size))
+        header.pop("__metadata__", None)
+        shapes.update((name, info["shape"]) for name, info in header.items())
+    
+    return shapes
+
 class VersionCompatibilityFixer:
     """版本兼容性修复器"""
     
@@ -38,12 +101,18 @@ class VersionCompatibilityFixer:
         """诊断版本兼容性问题"""
         logger.info("🔍 诊断版本兼容性问题...")
         
-        issues = {
-            'transformers_version': self._check_transformers_version(),
-            'tokenizer_compatibility': self._check_tokenizer_compatibility(),
-            'model_structure_compatibility': self._check_model_structure(),
-            'recommended_fixes': []
-        }
+        # 三项检查相互独立，主要耗时在磁盘/网络I/O，并行执行
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            version_future = executor.submit(self._check_transformers_version)
+            tokenizer_future = executor.submit(self._check_tokenizer_compatibility)
+            structure_future = executor.submit(self._check_model_structure)
+            
+            issues = {
+                'transformers_version': version_future.result(),
+                'tokenizer_compatibility': tokenizer_future.result(),
+                'model_structure_compatibility': structure_future.result(),
+                'recommended_fixes': []
+            }
         
         return issues
     
@@ -86,8 +155,7 @@ class VersionCompatibilityFixer:
         
         # 测试1: 直接加载原始分词器
         try:
-            from transformers import AutoTokenizer
-            tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+            tokenizer = _cached_tokenizer(str(self.model_dir))
             result['tests'].append({
                 'name': 'direct_loading',
                 'success': True,
@@ -102,8 +170,7 @@ class VersionCompatibilityFixer:
         
         # 测试2: 使用预训练基础模型
         try:
-            from transformers import AutoTokenizer
-            tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-base")
+            tokenizer = _cached_tokenizer("xlm-roberta-base")
             result['tests'].append({
                 'name': 'base_model_loading',
                 'success': True,
@@ -121,8 +188,8 @@ class VersionCompatibilityFixer:
         # 测试3: 检查tokenizer配置文件
         try:
             config_file = self.model_dir / "tokenizer_config.json"
-            with open(config_file) as f:
-                config = json.load(f)
+            config_bytes = config_file.read_bytes()
+            config = orjson.loads(config_bytes) if orjson is not None else json.loads(config_bytes)
             result['config_analysis'] = {
                 'model_max_length': config.get('model_max_length'),
                 'tokenizer_class': config.get('tokenizer_class'),
@@ -138,11 +205,11 @@ class VersionCompatibilityFixer:
         logger.info("🏗️  检查模型结构兼容性...")
         
         result = {'tests': []}
+        config = None
         
         # 测试1: 尝试加载模型配置
         try:
-            from transformers import AutoConfig
-            config = AutoConfig.from_pretrained(str(self.model_dir))
+            config = _cached_config(str(self.model_dir))
             result['config_loading'] = {
                 'success': True,
                 'architectures': config.architectures,
@@ -155,35 +222,58 @@ class VersionCompatibilityFixer:
                 'error': str(e)
             }
         
-        # 测试2: 尝试加载模型结构
+        # 测试2: 检查模型结构
         try:
-            from transformers import AutoModelForSequenceClassification
-            model = AutoModelForSequenceClassification.from_pretrained(str(self.model_dir))
-            
-            # 检查分类器结构
-            classifier_info = {}
-            if hasattr(model, 'classifier'):
-                classifier = model.classifier
-                classifier_info['has_classifier'] = True
-                classifier_info['classifier_type'] = type(classifier).__name__
+            # 只读取safetensors头部的张量形状，不加载权重
+            shapes = _read_safetensors_shapes(self.model_dir)
+            if shapes is not None:
+                # 检查分类器结构
+                classifier_shapes = {k: v for k, v in shapes.items() if k.startswith('classifier.')}
+                classifier_info = {
+                    'has_classifier': bool(classifier_shapes),
+                    'classifier_tensors': classifier_shapes
+                }
                 
-                # 尝试不同的属性访问方式
-                for attr in ['out_features', 'out_proj', 'dense']:
-                    if hasattr(classifier, attr):
-                        attr_val = getattr(classifier, attr)
-                        if hasattr(attr_val, 'out_features'):
-                            classifier_info[f'{attr}_out_features'] = attr_val.out_features
-                        classifier_info[attr] = str(type(attr_val))
-            
-            result['model_structure'] = {
-                'success': True,
-                'model_type': type(model).__name__,
-                'classifier_info': classifier_info,
-                'num_parameters': sum(p.numel() for p in model.parameters())
-            }
-            
-            # 保存模型引用
-            self._loaded_model = model
+                # RobertaClassificationHead (dense + out_proj) 或单层线性分类头
+                for attr in ['out_proj', 'dense']:
+                    weight_shape = classifier_shapes.get(f'classifier.{attr}.weight')
+                    if weight_shape:
+                        classifier_info[f'{attr}_out_features'] = weight_shape[0]
+                if 'classifier.weight' in classifier_shapes:
+                    classifier_info['out_features'] = classifier_shapes['classifier.weight'][0]
+                
+                result['model_structure'] = {
+                    'success': True,
+                    'model_type': config.architectures[0] if config is not None and config.architectures else None,
+                    'classifier_info': classifier_info,
+                    'num_parameters': sum(math.prod(shape) for shape in shapes.values())
+                }
+            else:
+                # pickle权重 (.bin) 无法只读元数据，回退到完整加载
+                from transformers import AutoModelForSequenceClassification
+                model = AutoModelForSequenceClassification.from_pretrained(str(self.model_dir))
+                
+                # 检查分类器结构
+                classifier_info = {}
+                if hasattr(model, 'classifier'):
+                    classifier = model.classifier
+                    classifier_info['has_classifier'] = True
+                    classifier_info['classifier_type'] = type(classifier).__name__
+                
+                    # 尝试不同的属性访问方式
+                    for attr in ['out_features', 'out_proj', 'dense']:
+                        if hasattr(classifier, attr):
+                            attr_val = getattr(classifier, attr)
+                            if hasattr(attr_val, 'out_features'):
+                                classifier_info[f'{attr}_out_features'] = attr_val.out_features
+                            classifier_info[attr] = str(type(attr_val))
+                
+                result['model_structure'] = {
+                    'success': True,
+                    'model_type': type(model).__name__,
+                    'classifier_info': classifier_info,
+                    'num_parameters': sum(p.numel() for p in model.parameters())
+                }
             
         except Exception as e:
             result['model_structure'] = {
@@ -208,12 +298,14 @@ class VersionCompatibilityFixer:
                     src = self.model_dir / file
                     dst = backup_dir / file
                     if src.exists():
-                        import shutil
                         shutil.copy2(src, dst)
                         logger.info(f"备份 {file} 到 {dst}")
                 
                 # 保存兼容的分词器
                 self._base_tokenizer.save_pretrained(str(self.model_dir))
+                
+                # 模型目录的分词器文件已被替换，丢弃旧的缓存实例
+                _cached_tokenizer.cache_clear()
                 logger.info("✅ 分词器兼容性修复完成")
                 
                 return True
@@ -244,8 +336,13 @@ class VersionCompatibilityFixer:
 import torch
 import torch.nn as nn
 import numpy as np
+import string
 import logging
-from typing import Dict, List, Union, Tuple, Optional
+import functools
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Union, Tuple, Optional, Any
 from transformers import (
     AutoTokenizer, 
     AutoModelForSequenceClassification,
@@ -253,23 +350,91 @@ from transformers import (
 )
 
 try:
-    from .config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG
+    import onnxruntime as ort  # 可选依赖，ONNX推理后端
+except ImportError:
+    ort = None
+
+try:
+    import accelerate  # 可选依赖，低内存加载和device_map
+except ImportError:
+    accelerate = None
+
+try:
+    from .config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG, TORCH_CONFIG
     from .emotion_mapper import GoEmotionsMapper
+    from .onnx_cache import checkpoint_fingerprint, ensure_onnx_export, ensure_int8_onnx
 except ImportError:
-    from config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG
+    from config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG, TORCH_CONFIG
     from emotion_mapper import GoEmotionsMapper
+    from onnx_cache import checkpoint_fingerprint, ensure_onnx_export, ensure_int8_onnx
 
 logger = logging.getLogger(__name__)
 
+_torch_runtime_configured = False
+
+# 只读零向量: 仅用于预先构建零结果字典，不直接返回给调用方
+_ZERO_VECTOR = np.zeros(27, dtype=np.float32)
+_ZERO_VECTOR.setflags(write=False)
+
+# 单个孤立标点不携带情绪，直接返回零向量，跳过分词和前向计算
+# (":)"、"!!!"、"?!" 等多字符标点组合可能带有情绪，仍正常推理)
+_PUNCT_SET = frozenset(string.punctuation + "。，、！？；：…—～·「」『』（）《》【】“”‘’")
+
+def _is_trivial_text(text: str) -> bool:
+    """空文本、纯空白或单个孤立标点"""
+    stripped = text.strip() if text else ""
+    return not stripped or stripped in _PUNCT_SET
+
+def configure_torch_runtime():
+    """
+    设置PyTorch CPU线程数与cuDNN选项 (进程内只生效一次)
+    
+    默认线程数常与宿主机不匹配，由TORCH_CONFIG / TORCH_NUM_THREADS 环境变量显式指定
+    """
+    global _torch_runtime_configured
+    
+    if _torch_runtime_configured:
+        return
+    _torch_runtime_configured = True
+    
+    torch.set_num_threads(TORCH_CONFIG["num_threads"])
+    try:
+        # 只能在首次并行计算之前设置
+        torch.set_num_interop_threads(TORCH_CONFIG["num_interop_threads"])
+    except RuntimeError as e:
+        logger.warning(f"⚠️ 无法设置算子间线程数: {e}")
+    
+    # 分桶后的批次形状重复出现，让cuDNN为每种形状缓存最快的算法
+    torch.backends.cudnn.benchmark = TORCH_CONFIG["cudnn_benchmark"]
+    
+    logger.info(f"🔧 PyTorch线程数: intra={torch.get_num_threads()}, interop={torch.get_num_interop_threads()}")
+
+@functools.lru_cache(maxsize=1)
+def _load_base_tokenizer():
+    """基础模型分词器 (兜底策略)，进程内只从磁盘/Hub加载一次"""
+    return AutoTokenizer.from_pretrained("xlm-roberta-base", use_fast=True)
+
+class _LogitsOnlyWrapper(nn.Module):
+    """ONNX导出用包装: 只输出logits张量"""
+    
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
 class CompatibleEmotionClassifier(nn.Module):
     """版本兼容的情感分类器"""
     
-    def __init__(self, model_name: str = None, num_labels: int = 27, load_pretrained: bool = True):
-        """初始化兼容版分类器"""
+    def __init__(self, model_name: str = None, num_labels: int = 27, load_pretrained: bool = True,
+                 quantize: bool = True):
+        """初始化兼容版分类器 (quantize: CPU推理时对nn.Linear做INT8动态量化)"""
         super().__init__()
         
         self.model_name = model_name or MODEL_CONFIG["model_name"]
         self.num_labels = num_labels
+        self.quantize = quantize
         self.emotion_names = COWEN_KELTNER_EMOTIONS
         
         # 设备检测 - 增强兼容性
@@ -279,6 +444,20 @@ class CompatibleEmotionClassifier(nn.Module):
         # 模型加载标志
         self.model_loaded = False
         self.tokenizer_loaded = False
+        self.precision = "fp32"
+        self.compiled = False
+        self.ort_session = None
+        self.model_dir = None
+        self._copy_stream = None  # CUDA主机到设备拷贝专用流 (按需创建)
+        
+        # 单条请求复用的常驻锁页缓冲区 (1, max_length)，上一次拷贝完成后才能覆盖
+        self._staging_buffers: Dict[str, torch.Tensor] = {}
+        self._staging_event = None
+        self._staging_lock = threading.Lock()
+        
+        # 分词结果LRU缓存 (text -> token ids)，更换分词器时清空
+        self._encoding_cache: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._encoding_cache_lock = threading.Lock()
         
         # 初始化模型
         if load_pretrained:
@@ -286,6 +465,7 @@ class CompatibleEmotionClassifier(nn.Module):
         
         # 初始化映射器
         self.mapper = GoEmotionsMapper()
+        self._zero_dict = self.mapper.map_ck_vector_to_dict(_ZERO_VECTOR)
         
         logger.info("✅ 兼容版情感分类器初始化完成")
     
@@ -317,18 +497,22 @@ class CompatibleEmotionClassifier(nn.Module):
             )
             
             # 尝试加载分词器 - 多种策略
-            self.tokenizer = self._load_tokenizer_safe()
+            self._set_tokenizer(self._load_tokenizer_safe())
             
             # 加载模型
             self.model = AutoModelForSequenceClassification.from_pretrained(
                 self.model_name,
                 config=config,
-                cache_dir=MODEL_PATHS["pretrained_cache"]
+                cache_dir=MODEL_PATHS["pretrained_cache"],
+                **self._model_load_kwargs()
             )
             
-            # 移动到设备
+            # 移动到设备 (已通过device_map加载到目标设备时为空操作)，只在加载时切换一次推理模式
             self.model.to(self.device)
+            self.model.eval()
             self.model_loaded = True
+            self.model_dir = None
+            self._prepare_inference_backend()
             
             logger.info("✅ 预训练模型加载成功")
             
@@ -336,13 +520,34 @@ class CompatibleEmotionClassifier(nn.Module):
             logger.error(f"❌ 预训练模型加载失败: {e}")
             # 不抛出异常，保持优雅降级
     
+    def _model_load_kwargs(self) -> Dict[str, Any]:
+        """
+        from_pretrained的加载参数
+        
+        直接以目标精度加载权重 (ONNX导出和CPU量化需要FP32)；
+        安装accelerate时跳过随机初始化并把权重直接放到目标设备，避免双倍峰值内存
+        """
+        dtype = torch.float32
+        if ort is None or INFERENCE_CONFIG["backend"] == "torch":
+            precision = INFERENCE_CONFIG["precision"]
+            if precision == "auto" and self.device == "cuda":
+                precision = "bf16" if torch.cuda.is_bf16_supported() else "fp16"
+            elif precision == "auto" and self.device == "mps":
+                precision = "fp16"
+            dtype = {"fp16": torch.float16, "bf16": torch.bfloat16}.get(precision, torch.float32)
+        
+        kwargs = {"torch_dtype": dtype}
+        if accelerate is not None:
+            kwargs.update(low_cpu_mem_usage=True, device_map={"": self.device})
+        return kwargs
+    
     def _load_tokenizer_safe(self):
         """安全的分词器加载"""
         tokenizer = None
         
         # 策略1: 直接从模型路径加载
         try:
-            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
             self.tokenizer_loaded = True
             logger.info("✅ 分词器加载成功 (策略1)")
             return tokenizer
@@ -351,7 +556,7 @@ class CompatibleEmotionClassifier(nn.Module):
         
         # 策略2: 从基础模型加载
         try:
-            tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-base")
+            tokenizer = _load_base_tokenizer()
             self.tokenizer_loaded = True
             logger.info("✅ 分词器加载成功 (策略2: 基础模型)")
             return tokenizer
@@ -360,6 +565,256 @@ class CompatibleEmotionClassifier(nn.Module):
             
         return tokenizer
     
+    @staticmethod
+    def _cpu_supports_bf16() -> bool:
+        """CPU是否支持BF16矩阵运算 (AVX512-BF16/AMX)"""
+        try:
+            return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+        except Exception:
+            return False
+    
+    def apply_inference_precision(self, precision: Optional[str] = None) -> str:
+        """
+        按设备切换推理精度
+        
+        - CUDA: FP16 (硬件支持时使用BF16)
+        - MPS: FP16
+        - CPU: nn.Linear 的INT8动态量化；未启用量化时，支持BF16指令则用BF16，否则保持FP32
+        
+        Args:
+            precision: "auto", "fp32", "fp16", "bf16", "int8"，默认取INFERENCE_CONFIG["precision"]
+            
+        Returns:
+            实际生效的精度
+        """
+        # 已切换过精度 (或已启用ONNX后端) 时直接返回，避免对已量化的模型重复量化
+        if not self.model_loaded or self.precision != "fp32" or self.ort_session is not None:
+            return self.precision
+        
+        precision = precision or INFERENCE_CONFIG["precision"]
+        if precision == "auto":
+            if self.device == "cuda":
+                precision = "bf16" if torch.cuda.is_bf16_supported() else "fp16"
+            elif self.device == "mps":
+                precision = "fp16"
+            elif self.quantize:
+                precision = "int8"
+            elif self._cpu_supports_bf16():
+                precision = "bf16"
+            else:
+                precision = "fp32"
+        
+        try:
+            if precision == "fp16":
+                self.model = self.model.half()
+            elif precision == "bf16":
+                self.model = self.model.to(torch.bfloat16)
+            elif precision == "int8":
+                if self.device != "cpu":
+                    raise ValueError("INT8动态量化仅支持CPU")
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {nn.Linear}, dtype=torch.qint8
+                )
+                self.model.eval()
+            elif precision != "fp32":
+                raise ValueError(f"不支持的推理精度: {precision}")
+        except Exception as e:
+            logger.warning(f"⚠️ 推理精度切换失败，保持FP32: {e}")
+            self.model = self.model.float()
+            precision = "fp32"
+        
+        self.precision = precision
+        logger.info(f"🔧 推理精度: {precision}")
+        return precision
+    
+    def _prepare_inference_backend(self):
+        """
+        模型加载后选择推理后端: 优先ONNX Runtime，不可用时在PyTorch上切换推理精度
+        
+        加载方法是推理后端的唯一配置入口，之后再调用enable_onnx_backend /
+        apply_inference_precision / compile_model 均直接返回当前状态
+        """
+        self.ort_session = None
+        self.compiled = False
+        self.precision = "fp32"
+        if INFERENCE_CONFIG["backend"] in ("auto", "onnx") and self.enable_onnx_backend():
+            return
+        self.apply_inference_precision()
+        if INFERENCE_CONFIG["torch_compile"]:
+            self.compile_model()
+    
+    def compile_model(self) -> bool:
+        """
+        用torch.compile编译模型前向 (dynamic=True，避免每种批大小/序列长度都重新编译)
+        
+        编译是惰性的，这里立即做两次预热前向，失败时回退到eager模式
+        
+        Returns:
+            是否编译成功
+        """
+        if not self.model_loaded or not self.tokenizer_loaded or self.compiled:
+            return self.compiled
+        
+        if not hasattr(torch, "compile"):
+            logger.info("💡 当前PyTorch不支持torch.compile，跳过编译")
+            return False
+        
+        eager_model = self.model
+        mode = "reduce-overhead" if self.device == "cuda" else "default"
+        
+        try:
+            eager_model.eval()
+            self.model = torch.compile(eager_model, mode=mode, fullgraph=False, dynamic=True)
+            
+            dummy = self.tokenizer("预热文本 warmup", return_tensors="pt")
+            dummy = {k: v.to(self.device) for k, v in dummy.items()}
+            with torch.inference_mode():
+                for _ in range(2):
+                    self.model(**dummy)
+            
+            self.compiled = True
+            logger.info(f"✅ 模型已通过torch.compile编译 (mode={mode})")
+        except Exception as e:
+            self.model = eager_model
+            logger.warning(f"⚠️ torch.compile编译失败，使用eager模式: {e}")
+        
+        return self.compiled
+    
+    def export_onnx(self, output_path: str = None) -> Path:
+        """
+        将当前模型导出为ONNX (应在切换推理精度之前调用，导出的是FP32计算图)
+        
+        Args:
+            output_path: 输出文件路径，默认缓存在当前模型目录旁
+            
+        Returns:
+            导出的ONNX文件路径
+        """
+        output_path = Path(output_path or self._default_onnx_path())
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        logger.info(f"📦 导出ONNX模型: {output_path}")
+        
+        dummy = self.tokenizer("预热文本 warmup", return_tensors="pt")
+        dummy = {k: v.to(self.device) for k, v in dummy.items()}
+        
+        self.model.eval()
+        torch.onnx.export(
+            _LogitsOnlyWrapper(self.model),
+            (dummy["input_ids"], dummy["attention_mask"]),
+            str(output_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"}
+            },
+            opset_version=17,
+            do_constant_folding=True
+        )
+        
+        logger.info("✅ ONNX模型导出成功")
+        return output_path
+    
+    def _default_onnx_path(self) -> Path:
+        """ONNX缓存路径: 微调模型导出到其目录下，预训练模型使用全局路径"""
+        if self.model_dir is not None:
+            return Path(self.model_dir) / "onnx" / "model.onnx"
+        return Path(MODEL_PATHS["onnx_model"])
+    
+    def enable_onnx_backend(self, onnx_path: str = None) -> bool:
+        """
+        切换到ONNX Runtime推理后端
+        
+        ONNX文件不存在或与当前checkpoint指纹不一致时先 (重新) 导出；
+        CPU上加载INT8动态量化模型；任何一步失败都保持PyTorch后端
+        
+        Args:
+            onnx_path: ONNX文件路径
+            
+        Returns:
+            是否成功启用
+        """
+        if ort is None:
+            logger.warning("⚠️ onnxruntime 未安装，使用PyTorch推理")
+            return False
+        
+        if not self.model_loaded or not self.tokenizer_loaded:
+            return False
+        
+        # 加载模型时已由_prepare_inference_backend启用，不重复创建会话
+        if self.ort_session is not None and onnx_path is None:
+            return True
+        
+        try:
+            onnx_path = Path(onnx_path or self._default_onnx_path())
+            fingerprint = checkpoint_fingerprint(self.model_dir, self.model.config)
+            ensure_onnx_export(onnx_path, fingerprint, self.export_onnx)
+            
+            int8 = self.quantize and self.device == "cpu" and INFERENCE_CONFIG["precision"] in ("auto", "int8")
+            if int8:
+                onnx_path = ensure_int8_onnx(onnx_path)
+            
+            providers = ["CPUExecutionProvider"]
+            if self.device == "cuda" and "CUDAExecutionProvider" in ort.get_available_providers():
+                providers.insert(0, "CUDAExecutionProvider")
+            
+            sess_options = ort.SessionOptions()
+            sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            sess_options.intra_op_num_threads = TORCH_CONFIG["num_threads"]
+            
+            self.ort_session = ort.InferenceSession(str(onnx_path), sess_options=sess_options, providers=providers)
+            self.precision = "onnx-int8" if int8 else "onnx"
+            logger.info(f"✅ 已启用ONNX Runtime推理后端: {self.ort_session.get_providers()}")
+            return True
+            
+        except Exception as e:
+            logger.warning(f"⚠️ ONNX Runtime后端启用失败，使用PyTorch推理: {e}")
+            self.ort_session = None
+            return False
+    
+    def _set_tokenizer(self, tokenizer):
+        """设置分词器并清空分词缓存"""
+        if tokenizer is not None and not getattr(tokenizer, "is_fast", False):
+            logger.warning("⚠️ 未能加载Rust快速分词器，分词将明显变慢")
+        
+        self.tokenizer = tokenizer
+        with self._encoding_cache_lock:
+            self._encoding_cache.clear()
+    
+    def _encode_texts(self, texts: List[str]) -> List[List[int]]:
+        """分词 (不填充)，命中缓存的文本直接复用，未命中的合并为一次批量分词"""
+        capacity = INFERENCE_CONFIG["tokenize_cache_size"]
+        encoded: List[Optional[List[int]]] = [None] * len(texts)
+        misses = []
+        
+        with self._encoding_cache_lock:
+            for i, text in enumerate(texts):
+                ids = self._encoding_cache.get(text)
+                if ids is None:
+                    misses.append(i)
+                else:
+                    self._encoding_cache.move_to_end(text)
+                    encoded[i] = ids
+        
+        if misses:
+            miss_ids = self.tokenizer(
+                [texts[i] for i in misses],
+                truncation=True,
+                max_length=MODEL_CONFIG["max_length"]
+            )["input_ids"]
+            
+            with self._encoding_cache_lock:
+                for i, ids in zip(misses, miss_ids):
+                    encoded[i] = ids
+                    if capacity > 0:
+                        self._encoding_cache[texts[i]] = ids
+                while len(self._encoding_cache) > capacity:
+                    self._encoding_cache.popitem(last=False)
+        
+        return encoded
+    
     def load_finetuned_model_safe(self, model_path: str = None):
         """安全的微调模型加载"""
         try:
@@ -367,19 +822,22 @@ class CompatibleEmotionClassifier(nn.Module):
             logger.info(f"📥 尝试加载微调模型: {model_path}")
             
             # 检查路径存在性
-            from pathlib import Path
             model_path = Path(model_path)
             if not model_path.exists():
                 raise FileNotFoundError(f"模型路径不存在: {model_path}")
             
             # 策略1: 直接加载
             try:
-                self.tokenizer = AutoTokenizer.from_pretrained(str(model_path))
-                self.model = AutoModelForSequenceClassification.from_pretrained(str(model_path))
+                self._set_tokenizer(AutoTokenizer.from_pretrained(str(model_path), use_fast=True))
+                self.model = AutoModelForSequenceClassification.from_pretrained(
+                    str(model_path), **self._model_load_kwargs()
+                )
                 self.model.to(self.device)
                 self.model.eval()
                 self.model_loaded = True
                 self.tokenizer_loaded = True
+                self.model_dir = model_path
+                self._prepare_inference_backend()
                 logger.info("✅ 微调模型加载成功 (策略1)")
                 return True
                 
@@ -389,14 +847,18 @@ class CompatibleEmotionClassifier(nn.Module):
                 # 策略2: 分别处理分词器和模型
                 try:
                     # 使用基础分词器
-                    self.tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-base")
+                    self._set_tokenizer(_load_base_tokenizer())
                     self.tokenizer_loaded = True
                     
                     # 加载微调的模型权重
-                    self.model = AutoModelForSequenceClassification.from_pretrained(str(model_path))
+                    self.model = AutoModelForSequenceClassification.from_pretrained(
+                        str(model_path), **self._model_load_kwargs()
+                    )
                     self.model.to(self.device)
                     self.model.eval()
                     self.model_loaded = True
+                    self.model_dir = model_path
+                    self._prepare_inference_backend()
                     
                     logger.info("✅ 微调模型加载成功 (策略2)")
                     return True
@@ -412,62 +874,159 @@ class CompatibleEmotionClassifier(nn.Module):
             self._load_pretrained_model_safe()
             return False
     
-    def predict_single(self, text: str, return_dict: bool = False) -> Union[np.ndarray, Dict[str, float]]:
-        """兼容版单文本预测"""
-        try:
-            # 检查模型状态
-            if not self.model_loaded or not self.tokenizer_loaded:
-                logger.warning("⚠️ 模型未正确加载，返回零向量")
-                zero_vector = np.zeros(27, dtype=np.float32)
-                return self.mapper.map_ck_vector_to_dict(zero_vector) if return_dict else zero_vector
-            
-            if not text or len(text.strip()) < 1:
-                logger.warning("⚠️ 输入文本为空，返回零向量")
-                zero_vector = np.zeros(27, dtype=np.float32)
-                return self.mapper.map_ck_vector_to_dict(zero_vector) if return_dict else zero_vector
-            
-            # 文本预处理和分词
-            inputs = self.tokenizer(
-                text,
-                padding=True,
-                truncation=True,
-                max_length=MODEL_CONFIG["max_length"],
-                return_tensors="pt"
-            )
-            
-            # 移动到设备
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+    def _to_device(self, inputs: Dict[str, torch.Tensor]) -> Tuple[Dict[str, torch.Tensor], Any]:
+        """
+        把批次移动到推理设备
+        
+        CUDA上使用锁页内存 + 独立拷贝流上的non_blocking拷贝，拷贝与其他请求的前向计算重叠
+        
+        Returns:
+            (设备上的输入张量, 拷贝完成事件或None)
+        """
+        if self.device != "cuda":
+            return {k: v.to(self.device) for k, v in inputs.items()}, None
+        
+        if self._copy_stream is None:
+            self._copy_stream = torch.cuda.Stream()
+        
+        with torch.cuda.stream(self._copy_stream):
+            if inputs["input_ids"].shape[0] == 1:
+                device_inputs, ready = self._copy_single_pinned(inputs)
+            else:
+                device_inputs = {
+                    k: v.pin_memory().to(self.device, non_blocking=True)
+                    for k, v in inputs.items()
+                }
+                ready = torch.cuda.Event()
+                ready.record(self._copy_stream)
+        
+        # 张量由计算流使用，告知缓存分配器避免提前复用显存
+        compute_stream = torch.cuda.current_stream()
+        for tensor in device_inputs.values():
+            tensor.record_stream(compute_stream)
+        
+        return device_inputs, ready
+    
+    def _copy_single_pinned(self, inputs: Dict[str, torch.Tensor]) -> Tuple[Dict[str, torch.Tensor], Any]:
+        """
+        单条请求经常驻锁页缓冲区拷贝到GPU (需在拷贝流上调用)
+        
+        只写入并传输实际长度的切片，不把计算填充到max_length；
+        省去每次请求的锁页内存分配
+        """
+        seq_len = inputs["input_ids"].shape[1]
+        
+        with self._staging_lock:
+            # 上一次异步拷贝读完缓冲区之前不能覆盖
+            if self._staging_event is not None:
+                self._staging_event.synchronize()
             
-            # 模型推理
-            self.model.eval()
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                logits = outputs.logits
+            device_inputs = {}
+            for k, v in inputs.items():
+                buffer = self._staging_buffers.get(k)
+                if buffer is None or buffer.dtype != v.dtype:
+                    buffer = torch.zeros((1, MODEL_CONFIG["max_length"]), dtype=v.dtype).pin_memory()
+                    self._staging_buffers[k] = buffer
                 
-                # 应用sigmoid激活 (多标签分类)
-                probabilities = torch.sigmoid(logits).cpu().numpy().flatten()
+                staged = buffer[:, :seq_len]
+                staged.copy_(v)
+                device_inputs[k] = staged.to(self.device, non_blocking=True)
             
-            # 确保输出维度正确
-            if len(probabilities) != 27:
-                logger.error(f"❌ 模型输出维度错误: 期望27维，实际{len(probabilities)}维")
-                probabilities = np.zeros(27, dtype=np.float32)
-            
-            # 应用置信度阈值
+            ready = torch.cuda.Event()
+            ready.record(self._copy_stream)
+            self._staging_event = ready
+        
+        return device_inputs, ready
+    
+    def predict_batch(self, texts: List[str], batch_size: Optional[int] = None,
+                      return_dict: bool = False) -> Union[np.ndarray, List[Dict[str, float]]]:
+        """
+        兼容版批量预测
+        
+        文本分词 (带缓存) 后按token长度排序分批前向计算，减少填充；
+        结果按输入顺序返回，空文本及失败批次保持零向量
+        """
+        # 检查模型状态
+        if not self.model_loaded or not self.tokenizer_loaded:
+            logger.warning("⚠️ 模型未正确加载，返回零向量")
+            valid_indices = []
+        else:
+            valid_indices = [i for i, text in enumerate(texts) if not _is_trivial_text(text)]
+            if len(valid_indices) < len(texts):
+                logger.warning("⚠️ 输入文本为空或仅为单个标点，返回零向量")
+        
+        # 没有可推理的文本时直接返回零结果 (零字典预先构建，跳过逐条映射)
+        if not valid_indices:
+            if return_dict:
+                return [dict(self._zero_dict) for _ in texts]
+            return np.zeros((len(texts), 27), dtype=np.float32)
+        
+        results = np.zeros((len(texts), 27), dtype=np.float32)
+        
+        try:
+            # 分词后按token长度排序，相近长度的文本进入同一批次
+            input_ids = dict(zip(valid_indices, self._encode_texts([texts[i] for i in valid_indices])))
+            valid_indices.sort(key=lambda i: len(input_ids[i]))
+            batch_size = batch_size or INFERENCE_CONFIG["max_batch_size"]
             threshold = INFERENCE_CONFIG["confidence_threshold"]
-            probabilities = np.where(probabilities > threshold, probabilities, 0.0)
-            
-            # 归一化到[0, 1]
-            probabilities = np.clip(probabilities, 0, 1)
             
-            if return_dict:
-                return self.mapper.map_ck_vector_to_dict(probabilities)
-            else:
-                return probabilities.astype(np.float32)
+            use_onnx = self.ort_session is not None
+            for start in range(0, len(valid_indices), batch_size):
+                batch_indices = valid_indices[start:start + batch_size]
+                
+                # 批内填充到最长序列
+                inputs = self.tokenizer.pad(
+                    {
+                        "input_ids": [input_ids[i] for i in batch_indices],
+                        "attention_mask": [[1] * len(input_ids[i]) for i in batch_indices]
+                    },
+                    padding=True,
+                    return_tensors="np" if use_onnx else "pt"
+                )
+                
+                # ONNX Runtime后端: 跳过PyTorch，直接在NumPy输入上运行计算图
+                if use_onnx:
+                    logits = self.ort_session.run(["logits"], dict(inputs))[0].astype(np.float32)
+                    probabilities = 1.0 / (1.0 + np.exp(-logits))
+                    
+                    # sigmoid输出本身在[0, 1]内，无需clip；原地乘以阈值掩码
+                    np.multiply(probabilities, probabilities > threshold, out=probabilities)
+                    results[batch_indices] = probabilities
+                    continue
+                
+                # 移动到设备
+                inputs, ready = self._to_device(inputs)
+                
+                # 模型推理 (后处理在设备上完成，只回传最终概率)
+                with torch.inference_mode():
+                    if ready is not None:
+                        torch.cuda.current_stream().wait_event(ready)
+                    outputs = self.model(**inputs)
+                    logits = outputs.logits
+                    
+                    # 确保输出维度正确
+                    if logits.shape[-1] != 27:
+                        logger.error(f"❌ 模型输出维度错误: 期望27维，实际{logits.shape[-1]}维")
+                        continue
+                    
+                    # 应用sigmoid激活 (多标签分类)；logits先转回FP32，低精度推理时也不会越出[0, 1]，无需clamp
+                    probabilities = torch.sigmoid(logits.float())
+                    
+                    # 应用置信度阈值 (原地)；掩码取 ~(p > t)，NaN同样被置零
+                    probabilities.masked_fill_(~(probabilities > threshold), 0.0)
+                
+                results[batch_indices] = probabilities.cpu().numpy()
                 
         except Exception as e:
-            logger.error(f"❌ 单文本预测失败: {e}")
-            zero_vector = np.zeros(27, dtype=np.float32)
-            return self.mapper.map_ck_vector_to_dict(zero_vector) if return_dict else zero_vector
+            logger.error(f"❌ 批量预测失败: {e}")
+        
+        if return_dict:
+            return [self.mapper.map_ck_vector_to_dict(vector) for vector in results]
+        return results
+    
+    def predict_single(self, text: str, return_dict: bool = False) -> Union[np.ndarray, Dict[str, float]]:
+        """兼容版单文本预测 (单元素批次)"""
+        return self.predict_batch([text], batch_size=1, return_dict=return_dict)[0]
     
     def get_model_info(self) -> Dict[str, Any]:
         """获取模型信息"""
@@ -475,6 +1034,8 @@ class CompatibleEmotionClassifier(nn.Module):
             'model_loaded': self.model_loaded,
             'tokenizer_loaded': self.tokenizer_loaded,
             'device': self.device,
+            'precision': self.precision,
+            'compiled': self.compiled,
             'model_name': self.model_name,
             'num_labels': self.num_labels
         }
@@ -507,10 +1068,10 @@ if __name__ == "__main__":
             
             # 保存兼容版分类器
             compatible_file = self.ac_root / "debug" / "emotion_classifier_compatible.py"
-            with open(compatible_file, 'w', encoding='utf-8') as f:
-                f.write(compatible_code)
-            
-            logger.info(f"✅ 兼容版分类器已保存: {compatible_file}")
+            if _write_if_changed(compatible_file, compatible_code.encode('utf-8')):
+                logger.info(f"✅ 兼容版分类器已保存: {compatible_file}")
+            else:
+                logger.info(f"✅ 兼容版分类器已是最新，跳过写入: {compatible_file}")
             return True
             
         except Exception as e:
@@ -530,19 +1091,101 @@ AC模块快速修复脚本
 2. python debug/quick_fix.py --fix        # 应用修复
 3. python debug/quick_fix.py --test       # 测试修复结果
 4. python debug/quick_fix.py --restore    # 恢复原始文件
+5. python debug/quick_fix.py --clear-cache  # 清除基础分词器下载缓存
 """
 
 import argparse
+import functools
+import hashlib
+import os
 import sys
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Set, Tuple
+
+# 路径只解析一次，各步骤共用
+AC_ROOT = Path(__file__).resolve().parent.parent
+MODEL_DIR = AC_ROOT / "models" / "finetuned_xlm_roberta"
+BACKUP_DIR = AC_ROOT / "debug" / "backup"
+
+BASE_TOKENIZER_NAME = "xlm-roberta-base"
+BASE_TOKENIZER_FILES = [
+    "tokenizer.json",
+    "tokenizer_config.json",
+    "sentencepiece.bpe.model",
+    "special_tokens_map.json"
+]
+
+# 基础分词器下载到本脚本专用的缓存目录，重复--fix时直接命中本地文件；
+# 不修改HF_HOME，--clear-cache也只会删除这个目录，不影响用户共享的HF缓存
+HF_CACHE_DIR = Path.home() / ".cache" / "hf_ac_fix"
+
+@functools.lru_cache(maxsize=None)
+def _fetch_base_tokenizer_files() -> Path:
+    """
+    获取基础模型分词器文件所在的本地快照目录
+    
+    只下载分词器相关文件，不构建分词器对象；进程内缓存，优先读取本地HF缓存，缺失时再联网下载
+    """
+    from huggingface_hub import snapshot_download
+    try:
+        return Path(snapshot_download(BASE_TOKENIZER_NAME, allow_patterns=BASE_TOKENIZER_FILES,
+                                      cache_dir=HF_CACHE_DIR, local_files_only=True))
+    except (OSError, ValueError):
+        return Path(snapshot_download(BASE_TOKENIZER_NAME, allow_patterns=BASE_TOKENIZER_FILES,
+                                      cache_dir=HF_CACHE_DIR))
+
+def clear_tokenizer_cache():
+    """清除基础分词器的进程内缓存和本地下载缓存"""
+    _fetch_base_tokenizer_files.cache_clear()
+    
+    repo_cache = HF_CACHE_DIR / f"models--{BASE_TOKENIZER_NAME.replace('/', '--')}"
+    if repo_cache.exists():
+        shutil.rmtree(repo_cache)
+        print(f"✅ 已清除分词器缓存: {repo_cache}")
+    else:
+        print("💡 未找到分词器缓存")
+
+def _file_fingerprint(path: Path) -> str:
+    """文件内容的blake2b摘要"""
+    return hashlib.blake2b(path.read_bytes()).hexdigest()
+
+def _existing_files(directory: Path, names: List[str]) -> Set[str]:
+    """一次目录扫描，返回names中实际存在的文件名"""
+    wanted = set(names)
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries if entry.name in wanted and entry.is_file()}
+    except FileNotFoundError:
+        return set()
+
+def _copy_all(jobs: List[Tuple[str, Path, Path]]) -> List[str]:
+    """
+    并行复制多个文件 (相互独立，以I/O为主)
+    
+    备份与恢复都使用shutil.copy2，保留修改时间和权限位 (Linux上同样走sendfile快速路径)
+    
+    Args:
+        jobs: (文件名, 源路径, 目标路径) 列表，源文件须已确认存在
+        
+    Returns:
+        按jobs顺序排列的已复制文件名
+    """
+    if not jobs:
+        return []
+    
+    def copy_one(job: Tuple[str, Path, Path]) -> str:
+        name, src, dst = job
+        shutil.copy2(str(src), str(dst))
+        return name
+    
+    with ThreadPoolExecutor(max_workers=min(8, len(jobs))) as executor:
+        return list(executor.map(copy_one, jobs))
 
 def backup_files():
     """备份原始文件"""
-    ac_root = Path(__file__).parent.parent
-    model_dir = ac_root / "models" / "finetuned_xlm_roberta"
-    backup_dir = ac_root / "debug" / "backup"
-    backup_dir.mkdir(exist_ok=True)
+    BACKUP_DIR.mkdir(exist_ok=True)
     
     files_to_backup = [
         "emotion_classifier.py",
@@ -556,49 +1199,61 @@ def backup_files():
     
     print("📦 备份原始文件...")
     
-    # 备份AC模块文件
-    for file in files_to_backup:
-        src = ac_root / file
-        dst = backup_dir / file
-        if src.exists():
-            shutil.copy2(src, dst)
-            print(f"✅ 已备份: {file}")
-    
-    # 备份模型文件
-    for file in model_files_to_backup:
-        src = model_dir / file
-        dst = backup_dir / file
-        if src.exists():
-            shutil.copy2(src, dst)
-            print(f"✅ 已备份: {file}")
+    # AC模块文件和模型文件一起并行备份，完成后按原顺序输出
+    ac_existing = _existing_files(AC_ROOT, files_to_backup)
+    model_existing = _existing_files(MODEL_DIR, model_files_to_backup)
+    jobs = [(file, AC_ROOT / file, BACKUP_DIR / file) for file in files_to_backup if file in ac_existing]
+    jobs += [(file, MODEL_DIR / file, BACKUP_DIR / file) for file in model_files_to_backup if file in model_existing]
+    
+    for file in _copy_all(jobs):
+        print(f"✅ 已备份: {file}")
     
     print("✅ 备份完成")
 
 def apply_fix():
     """应用修复"""
-    ac_root = Path(__file__).parent.parent
-    
     print("🔧 应用版本兼容修复...")
     
     # 1. 重新生成兼容的分词器
     try:
-        from transformers import AutoTokenizer
-        model_dir = ac_root / "models" / "finetuned_xlm_roberta"
+        tokenizer_file = MODEL_DIR / "tokenizer.json"
+        fingerprint_file = BACKUP_DIR / ".tokenizer_fingerprint"
         
-        # 使用基础模型分词器
-        tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-base")
-        tokenizer.save_pretrained(str(model_dir))
-        print("✅ 分词器已修复")
+        # 上次修复写入的分词器未被改动时跳过下载和重新保存
+        if (tokenizer_file.exists() and fingerprint_file.exists()
+                and _file_fingerprint(tokenizer_file) == fingerprint_file.read_text().strip()):
+            print("✅ 分词器已是兼容版本，跳过")
+        else:
+            # 使用基础模型分词器: 快照文件齐全时直接复制，跳过分词器构建和重新序列化
+            snapshot_dir = _fetch_base_tokenizer_files()
+            missing_files = [file for file in BASE_TOKENIZER_FILES if not (snapshot_dir / file).exists()]
+            
+            if missing_files:
+                # 基础模型仓库不一定提供tokenizer_config.json等文件，
+                # 此时由save_pretrained重新生成全部分词器文件，覆盖旧版本不兼容的配置
+                from transformers import AutoTokenizer
+                print(f"💡 快照中缺少 {missing_files}，重新生成分词器文件")
+                tokenizer = AutoTokenizer.from_pretrained(BASE_TOKENIZER_NAME, cache_dir=str(HF_CACHE_DIR))
+                tokenizer.save_pretrained(str(MODEL_DIR))
+            else:
+                for file in BASE_TOKENIZER_FILES:
+                    shutil.copy2(str(snapshot_dir / file), str(MODEL_DIR / file))
+            BACKUP_DIR.mkdir(exist_ok=True)
+            fingerprint_file.write_text(_file_fingerprint(tokenizer_file))
+            print("✅ 分词器已修复")
     except Exception as e:
         print(f"❌ 分词器修复失败: {e}")
     
     # 2. 替换为兼容版emotion_classifier
     try:
-        compatible_file = ac_root / "debug" / "emotion_classifier_compatible.py"
-        target_file = ac_root / "emotion_classifier.py"
+        compatible_file = AC_ROOT / "debug" / "emotion_classifier_compatible.py"
+        target_file = AC_ROOT / "emotion_classifier.py"
         
         if compatible_file.exists():
-            shutil.copy2(compatible_file, target_file)
+            # 先写临时文件再原子替换，中途失败不会留下半个emotion_classifier.py
+            tmp_file = target_file.with_suffix(".py.tmp")
+            shutil.copy2(str(compatible_file), str(tmp_file))
+            os.replace(str(tmp_file), str(target_file))
             print("✅ 情感分类器已替换为兼容版")
     except Exception as e:
         print(f"❌ 分类器替换失败: {e}")
@@ -610,8 +1265,9 @@ def test_fix():
     print("🧪 测试修复结果...")
     
     try:
-        # 导入并测试兼容版分类器
-        sys.path.insert(0, str(Path(__file__).parent.parent))
+        # 导入并测试兼容版分类器 (numpy等重依赖只在测试时导入，--backup/--restore保持轻量)
+        import numpy as np
+        sys.path.insert(0, str(AC_ROOT))
         from emotion_classifier import CompatibleEmotionClassifier
         
         # 创建分类器实例
@@ -633,10 +1289,10 @@ def test_fix():
             ]
             
             print("\\n🧪 测试预测:")
-            for text in test_texts:
-                result = classifier.predict_single(text)
-                active_emotions = sum(1 for x in result if x > 0.1)
-                print(f"文本: '{text}' -> 活跃情绪数: {active_emotions}, 向量和: {sum(result):.3f}")
+            vectors = classifier.predict_batch(test_texts)
+            for text, result in zip(test_texts, vectors):
+                active_emotions = int(np.count_nonzero(result > 0.1))
+                print(f"文本: '{text}' -> 活跃情绪数: {active_emotions}, 向量和: {float(result.sum()):.3f}")
             
             print("✅ 功能测试通过")
         else:
@@ -649,10 +1305,7 @@ def restore_files():
     """恢复原始文件"""
     print("🔄 恢复原始文件...")
     
-    ac_root = Path(__file__).parent.parent
-    backup_dir = ac_root / "debug" / "backup"
-    
-    if not backup_dir.exists():
+    if not BACKUP_DIR.exists():
         print("❌ 未找到备份目录")
         return
     
@@ -661,12 +1314,11 @@ def restore_files():
         "inference_api.py"
     ]
     
-    for file in files_to_restore:
-        src = backup_dir / file
-        dst = ac_root / file
-        if src.exists():
-            shutil.copy2(src, dst)
-            print(f"✅ 已恢复: {file}")
+    backup_existing = _existing_files(BACKUP_DIR, files_to_restore)
+    jobs = [(file, BACKUP_DIR / file, AC_ROOT / file) for file in files_to_restore if file in backup_existing]
+    
+    for file in _copy_all(jobs):
+        print(f"✅ 已恢复: {file}")
     
     print("✅ 恢复完成")
 
@@ -677,9 +1329,13 @@ def main():
     parser.add_argument("--test", action="store_true", help="测试修复结果")
     parser.add_argument("--restore", action="store_true", help="恢复原始文件")
     parser.add_argument("--all", action="store_true", help="执行完整修复流程")
+    parser.add_argument("--clear-cache", action="store_true", help="清除基础分词器下载缓存")
     
     args = parser.parse_args()
     
+    if args.clear_cache:
+        clear_tokenizer_cache()
+    
     if args.all:
         backup_files()
         apply_fix()
@@ -692,7 +1348,7 @@ def main():
         test_fix()
     elif args.restore:
         restore_files()
-    else:
+    elif not args.clear_cache:
         parser.print_help()
 
 if __name__ == "__main__":
@@ -701,14 +1357,16 @@ if __name__ == "__main__":
         
         # 保存修复脚本
         fix_script_path = self.ac_root / "debug" / "quick_fix.py"
-        with open(fix_script_path, 'w', encoding='utf-8') as f:
-            f.write(fix_script)
+        written = _write_if_changed(fix_script_path, fix_script.encode('utf-8'))
         
         # 添加执行权限
         import stat
         fix_script_path.chmod(fix_script_path.stat().st_mode | stat.S_IEXEC)
         
-        logger.info(f"✅ 快速修复脚本已创建: {fix_script_path}")
+        if written:
+            logger.info(f"✅ 快速修复脚本已创建: {fix_script_path}")
+        else:
+            logger.info(f"✅ 快速修复脚本已是最新，跳过写入: {fix_script_path}")
         return True
     
     def run_complete_fix(self) -> Dict[str, Any]:
@@ -735,9 +1393,11 @@ if __name__ == "__main__":
         
         # 4. 保存修复报告
         report_path = self.ac_root / "debug" / "compatibility_fix_report.json"
-        import json
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            report = orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            report = json.dumps(results, ensure_ascii=False, indent=2).encode('utf-8')
+        _write_if_changed(report_path, report)
         
         logger.info(f"📄 修复报告已保存: {report_path}")
         logger.info(f"✅ 修复流程完成，应用了 {len(results['fixes_applied'])} 个修复")
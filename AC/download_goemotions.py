@@ -118,47 +118,30 @@ class GoEmotionsDownloader:
         try:
             logger.info("🔄 转换为多标签格式...")
             
-            # 创建结果DataFrame
-            result_data = []
-            
-            for idx, row in df.iterrows():
-                text = row['text']
-                emotion_ids = row['emotion_ids']
-                
-                # 解析情绪ID
-                if pd.isna(emotion_ids) or emotion_ids == '':
-                    continue
-                
-                # 处理情绪ID列表
-                try:
-                    if isinstance(emotion_ids, str):
-                        # 格式可能是 "1,5,12" 或 "[1,5,12]"
-                        emotion_ids = emotion_ids.strip('[]')
-                        if emotion_ids:
-                            emotion_id_list = [int(x.strip()) for x in emotion_ids.split(',') if x.strip()]
-                        else:
-                            continue
-                    else:
-                        emotion_id_list = [int(emotion_ids)]
-                except (ValueError, TypeError):
-                    logger.warning(f"⚠️  无法解析情绪ID: {emotion_ids}")
-                    continue
-                
-                # 创建多标签向量 (27维GoEmotions标签)
-                label_vector = [0.0] * len(GOEMOTIONS_LABELS)
-                
-                for emotion_id in emotion_id_list:
-                    if 0 <= emotion_id < len(GOEMOTIONS_LABELS):
-                        label_vector[emotion_id] = 1.0
-                
-                # 构建数据行
-                data_row = {'text': text}
-                for i, label in enumerate(GOEMOTIONS_LABELS):
-                    data_row[label] = label_vector[i]
-                
-                result_data.append(data_row)
-            
-            result_df = pd.DataFrame(result_data)
+            num_labels = len(GOEMOTIONS_LABELS)
+            df = df.reset_index(drop=True)
+            
+            # 解析情绪ID: 格式可能是 "1,5,12" 或 "[1,5,12]"，拆成每行一个ID (空ID视为无标签，整行跳过)
+            emotion_ids = df['emotion_ids']
+            emotion_ids = emotion_ids[emotion_ids.notna()].astype(str).str.strip('[]')
+            tokens = emotion_ids.str.split(',').explode().str.strip()
+            tokens = tokens[tokens != '']
+            ids = pd.to_numeric(tokens, errors='coerce')
+            
+            # 含无法解析ID的行整行跳过
+            bad_rows = ids.index[ids.isna()].unique()
+            for bad_ids in emotion_ids.loc[bad_rows]:
+                logger.warning(f"⚠️  无法解析情绪ID: {bad_ids}")
+            ids = ids[~ids.index.isin(bad_rows)].astype(np.int64)
+            
+            # 创建多标签矩阵 (27维GoEmotions标签)，超出范围的ID (如neutral) 忽略但保留该行
+            kept_rows = ids.index.unique()
+            in_range = ids[(ids >= 0) & (ids < num_labels)]
+            label_matrix = np.zeros((len(kept_rows), num_labels), dtype=np.float32)
+            label_matrix[kept_rows.get_indexer(in_range.index), in_range.to_numpy()] = 1.0
+            
+            result_df = pd.DataFrame(label_matrix, columns=GOEMOTIONS_LABELS)
+            result_df.insert(0, 'text', df.loc[kept_rows, 'text'].to_numpy())
             logger.info(f"✅ 多标签转换完成: {len(result_df)} 条记录")
             
             # 统计标签分布
@@ -195,43 +178,20 @@ class GoEmotionsDownloader:
             from emotion_mapper import GoEmotionsMapper
             mapper = GoEmotionsMapper()
             
-            result_data = []
-            conversion_stats = {ck_emotion: 0 for ck_emotion in COWEN_KELTNER_EMOTIONS}
+            # 提取GoEmotions分数矩阵 (缺失的标签列视为0) 并一次性映射到C&K
+            ge_matrix = df.reindex(columns=GOEMOTIONS_LABELS, fill_value=0.0).to_numpy(dtype=np.float32)
+            ck_matrix = mapper.map_batch(ge_matrix)
             
-            for idx, row in df.iterrows():
-                text = row['text']
-                
-                # 提取GoEmotions分数
-                ge_scores = {}
-                for label in GOEMOTIONS_LABELS:
-                    if label in row:
-                        ge_scores[label] = float(row[label])
-                
-                # 映射到C&K向量
-                ck_vector = mapper.map_goemotions_to_ck_vector(ge_scores)
-                
-                # 构建数据行
-                data_row = {'text': text}
-                
-                # 添加C&K情绪列
-                for i, emotion in enumerate(COWEN_KELTNER_EMOTIONS):
-                    data_row[emotion] = float(ck_vector[i])
-                    if ck_vector[i] > 0:
-                        conversion_stats[emotion] += 1
-                
-                # 添加元数据
-                active_ge_labels = [label for label, score in ge_scores.items() if score > 0]
-                data_row['original_goemotions'] = ','.join(active_ge_labels)
-                data_row['max_emotion'] = COWEN_KELTNER_EMOTIONS[np.argmax(ck_vector)]
-                data_row['emotion_intensity'] = float(np.max(ck_vector))
-                data_row['total_intensity'] = float(np.sum(ck_vector))
-                
-                result_data.append(data_row)
-                
-                if (idx + 1) % 1000 == 0:
-                    logger.info(f"   转换进度: {idx + 1}/{len(df)}")
+            # 构建结果: 文本 + C&K情绪列 + 元数据
+            result_df = pd.DataFrame(ck_matrix, columns=COWEN_KELTNER_EMOTIONS)
+            result_df.insert(0, 'text', df['text'].to_numpy())
+            result_df['original_goemotions'] = mapper.join_active_labels(ge_matrix)
+            result_df['max_emotion'] = np.asarray(COWEN_KELTNER_EMOTIONS)[ck_matrix.argmax(axis=1)]
+            result_df['emotion_intensity'] = ck_matrix.max(axis=1)
+            result_df['total_intensity'] = ck_matrix.sum(axis=1)
+            
+            conversion_stats = dict(zip(COWEN_KELTNER_EMOTIONS, np.count_nonzero(ck_matrix > 0, axis=0).tolist()))
             
-            result_df = pd.DataFrame(result_data)
             logger.info(f"✅ C&K格式转换完成: {len(result_df)} 条记录")
             
             # 统计C&K情绪分布
@@ -9,10 +9,14 @@
 4. 错误处理增强
 """
 
+import os
 import torch
 import torch.nn as nn
 import numpy as np
 import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
 from typing import Dict, List, Union, Tuple, Optional, Any
 from transformers import (
     AutoTokenizer, 
@@ -21,23 +25,77 @@ from transformers import (
 )
 
 try:
-    from .config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG
-    from .emotion_mapper import GoEmotionsMapper
+    import onnxruntime as ort  # 可选依赖，ONNX推理后端
 except ImportError:
-    from config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG
-    from emotion_mapper import GoEmotionsMapper
+    ort = None
+
+try:
+    from .config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG, TORCH_CONFIG
+    from .emotion_mapper import get_shared_mapper
+    from .onnx_cache import checkpoint_fingerprint, ensure_onnx_export, ensure_int8_onnx, trt_cache_dir
+except ImportError:
+    from config import MODEL_CONFIG, MODEL_PATHS, COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG, TORCH_CONFIG
+    from emotion_mapper import get_shared_mapper
+    from onnx_cache import checkpoint_fingerprint, ensure_onnx_export, ensure_int8_onnx, trt_cache_dir
 
 logger = logging.getLogger(__name__)
 
+_torch_runtime_configured = False
+
+# 只读零向量: 内部映射零结果时共用；公开方法返回其副本，调用方可原地修改
+_ZERO_VECTOR = np.zeros(27, dtype=np.float32)
+_ZERO_VECTOR.setflags(write=False)
+
+def configure_torch_runtime():
+    """
+    设置PyTorch CPU线程数与cuDNN选项 (进程内只生效一次)
+    
+    默认线程数常与宿主机不匹配，由TORCH_CONFIG / TORCH_NUM_THREADS 环境变量显式指定
+    """
+    global _torch_runtime_configured
+    
+    if _torch_runtime_configured:
+        return
+    _torch_runtime_configured = True
+    
+    torch.set_num_threads(TORCH_CONFIG["num_threads"])
+    try:
+        # 只能在首次并行计算之前设置
+        torch.set_num_interop_threads(TORCH_CONFIG["num_interop_threads"])
+    except RuntimeError as e:
+        logger.warning(f"⚠️ 无法设置算子间线程数: {e}")
+    
+    # 分桶后的批次形状重复出现，让cuDNN为每种形状缓存最快的算法
+    torch.backends.cudnn.benchmark = TORCH_CONFIG["cudnn_benchmark"]
+    
+    logger.info(f"🔧 PyTorch线程数: intra={torch.get_num_threads()}, interop={torch.get_num_interop_threads()}")
+
+class _LogitsOnlyWrapper(nn.Module):
+    """ONNX导出用包装: 只输出logits张量"""
+    
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
 class CompatibleEmotionClassifier(nn.Module):
     """版本兼容的情感分类器"""
     
-    def __init__(self, model_name: str = None, num_labels: int = 27, load_pretrained: bool = True):
-        """初始化兼容版分类器"""
+    def __init__(self, model_name: str = None, num_labels: int = 27, load_pretrained: bool = True,
+                 quantize: bool = True):
+        """
+        初始化兼容版分类器
+        
+        Args:
+            quantize: CPU推理时是否使用INT8动态量化 (PyTorch与ONNX后端均适用)
+        """
         super().__init__()
         
         self.model_name = model_name or MODEL_CONFIG["model_name"]
         self.num_labels = num_labels
+        self.quantize = quantize
         self.emotion_names = COWEN_KELTNER_EMOTIONS
         
         # 设备检测 - 增强兼容性
@@ -47,13 +105,23 @@ class CompatibleEmotionClassifier(nn.Module):
         # 模型加载标志
         self.model_loaded = False
         self.tokenizer_loaded = False
+        self.precision = "fp32"
+        self.compiled = False
+        self.ort_session = None
+        self.model_dir = None  # 当前加载的微调模型目录 (预训练模型为None)
+        self._copy_stream = None  # CUDA主机到设备拷贝专用流 (按需创建)
+        
+        # 分词结果LRU缓存 (文本 -> token id列表)，重复文本跳过分词
+        self.tokenizer = None
+        self._encoding_cache: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._encoding_cache_lock = threading.Lock()
         
         # 初始化模型
         if load_pretrained:
             self._load_pretrained_model_safe()
         
         # 初始化映射器
-        self.mapper = GoEmotionsMapper()
+        self.mapper = get_shared_mapper()
         
         logger.info("✅ 兼容版情感分类器初始化完成")
     
@@ -85,7 +153,7 @@ class CompatibleEmotionClassifier(nn.Module):
             )
             
             # 尝试加载分词器 - 多种策略
-            self.tokenizer = self._load_tokenizer_safe()
+            self._set_tokenizer(self._load_tokenizer_safe())
             
             # 加载模型
             self.model = AutoModelForSequenceClassification.from_pretrained(
@@ -96,6 +164,7 @@ class CompatibleEmotionClassifier(nn.Module):
             
             # 移动到设备
             self.model.to(self.device)
+            self._prepare_for_inference()
             self.model_loaded = True
             
             logger.info("✅ 预训练模型加载成功")
@@ -104,13 +173,18 @@ class CompatibleEmotionClassifier(nn.Module):
             logger.error(f"❌ 预训练模型加载失败: {e}")
             # 不抛出异常，保持优雅降级
     
+    def _prepare_for_inference(self):
+        """加载后一次性切换到推理状态: eval模式并冻结全部参数"""
+        self.model.eval()
+        self.model.requires_grad_(False)
+    
     def _load_tokenizer_safe(self):
         """安全的分词器加载"""
         tokenizer = None
         
         # 策略1: 直接从模型路径加载
         try:
-            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
             self.tokenizer_loaded = True
             logger.info("✅ 分词器加载成功 (策略1)")
             return tokenizer
@@ -119,7 +193,7 @@ class CompatibleEmotionClassifier(nn.Module):
         
         # 策略2: 从基础模型加载
         try:
-            tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-base")
+            tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-base", use_fast=True)
             self.tokenizer_loaded = True
             logger.info("✅ 分词器加载成功 (策略2: 基础模型)")
             return tokenizer
@@ -128,6 +202,64 @@ class CompatibleEmotionClassifier(nn.Module):
             
         return tokenizer
     
+    def _set_tokenizer(self, tokenizer):
+        """设置分词器并清空分词缓存"""
+        if tokenizer is not None and not getattr(tokenizer, "is_fast", False):
+            logger.warning("⚠️ 未能加载Rust快速分词器，分词将明显变慢")
+        
+        self.tokenizer = tokenizer
+        with self._encoding_cache_lock:
+            self._encoding_cache.clear()
+    
+    def _encode_texts(self, texts: List[str]) -> List[List[int]]:
+        """
+        分词 (不填充)，命中缓存的文本直接复用，未命中的合并为一次批量分词
+        
+        Args:
+            texts: 非空文本列表
+            
+        Returns:
+            与texts一一对应的token id列表
+        """
+        capacity = INFERENCE_CONFIG["tokenize_cache_size"]
+        encoded: List[Optional[List[int]]] = [None] * len(texts)
+        misses = []
+        
+        with self._encoding_cache_lock:
+            for i, text in enumerate(texts):
+                ids = self._encoding_cache.get(text)
+                if ids is None:
+                    misses.append(i)
+                else:
+                    self._encoding_cache.move_to_end(text)
+                    encoded[i] = ids
+        
+        if misses:
+            miss_ids = self.tokenizer(
+                [texts[i] for i in misses],
+                truncation=True,
+                max_length=MODEL_CONFIG["max_length"]
+            )["input_ids"]
+            
+            with self._encoding_cache_lock:
+                for i, ids in zip(misses, miss_ids):
+                    encoded[i] = ids
+                    if capacity > 0:
+                        self._encoding_cache[texts[i]] = ids
+                while len(self._encoding_cache) > capacity:
+                    self._encoding_cache.popitem(last=False)
+        
+        return encoded
+    
+    def _tokenize_text(self, text: str) -> Dict[str, torch.Tensor]:
+        """单文本分词为张量 (用于预热、导出等一次性步骤)"""
+        return self.tokenizer(
+            text,
+            truncation=True,
+            max_length=MODEL_CONFIG["max_length"],
+            return_tensors="pt"
+        )
+    
     def load_finetuned_model_safe(self, model_path: str = None):
         """安全的微调模型加载"""
         try:
@@ -142,12 +274,13 @@ class CompatibleEmotionClassifier(nn.Module):
             
             # 策略1: 直接加载
             try:
-                self.tokenizer = AutoTokenizer.from_pretrained(str(model_path))
+                self._set_tokenizer(AutoTokenizer.from_pretrained(str(model_path), use_fast=True))
                 self.model = AutoModelForSequenceClassification.from_pretrained(str(model_path))
                 self.model.to(self.device)
-                self.model.eval()
+                self._prepare_for_inference()
                 self.model_loaded = True
                 self.tokenizer_loaded = True
+                self.model_dir = model_path
                 logger.info("✅ 微调模型加载成功 (策略1)")
                 return True
                 
@@ -157,14 +290,15 @@ class CompatibleEmotionClassifier(nn.Module):
                 # 策略2: 分别处理分词器和模型
                 try:
                     # 使用基础分词器
-                    self.tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-base")
+                    self._set_tokenizer(AutoTokenizer.from_pretrained("xlm-roberta-base", use_fast=True))
                     self.tokenizer_loaded = True
                     
                     # 加载微调的模型权重
                     self.model = AutoModelForSequenceClassification.from_pretrained(str(model_path))
                     self.model.to(self.device)
-                    self.model.eval()
+                    self._prepare_for_inference()
                     self.model_loaded = True
+                    self.model_dir = model_path
                     
                     logger.info("✅ 微调模型加载成功 (策略2)")
                     return True
@@ -180,80 +314,419 @@ class CompatibleEmotionClassifier(nn.Module):
             self._load_pretrained_model_safe()
             return False
     
+    def apply_inference_precision(self, precision: str = "auto") -> str:
+        """
+        按设备切换推理精度
+        
+        - CUDA: FP16 (硬件支持时使用BF16)
+        - MPS: FP16
+        - CPU: nn.Linear 的INT8动态量化
+        - 其他情况或"fp32": 保持FP32
+        
+        Args:
+            precision: "auto", "fp32", "fp16", "bf16", "int8"
+            
+        Returns:
+            实际生效的精度
+        """
+        if not self.model_loaded:
+            return self.precision
+        
+        if precision == "auto":
+            if self.device == "cuda":
+                precision = "bf16" if torch.cuda.is_bf16_supported() else "fp16"
+            elif self.device == "mps":
+                precision = "fp16"
+            elif self.device == "cpu" and self.quantize:
+                precision = "int8"
+            else:
+                precision = "fp32"
+        
+        try:
+            if precision == "fp16":
+                self.model = self.model.half()
+            elif precision == "bf16":
+                self.model = self.model.to(torch.bfloat16)
+            elif precision == "int8":
+                if self.device != "cpu":
+                    raise ValueError("INT8动态量化仅支持CPU")
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {nn.Linear}, dtype=torch.qint8
+                )
+            elif precision != "fp32":
+                raise ValueError(f"不支持的推理精度: {precision}")
+        except Exception as e:
+            logger.warning(f"⚠️ 推理精度切换失败，保持FP32: {e}")
+            precision = "fp32"
+        
+        self.precision = precision
+        logger.info(f"🔧 推理精度: {precision}")
+        return precision
+    
+    def compile_model(self) -> bool:
+        """
+        用torch.compile编译模型前向
+        
+        文本长度不固定，使用dynamic=True避免每种序列长度都重新编译；
+        CUDA上使用reduce-overhead模式 (CUDA Graphs)，把每次前向的大量内核启动合并为一次图重放。
+        torch.compile是惰性的，图捕获发生在首次前向，因此编译后立即做两次预热前向，
+        编译失败时在这里回退到eager模式，而不是落到第一个请求上。
+        
+        Returns:
+            是否编译成功
+        """
+        if not self.model_loaded or self.compiled:
+            return self.compiled
+        
+        if not hasattr(torch, "compile"):
+            logger.info("💡 当前PyTorch不支持torch.compile，跳过编译")
+            return False
+        
+        eager_model = self.model
+        mode = "reduce-overhead" if self.device == "cuda" else "default"
+        
+        try:
+            self.model = torch.compile(eager_model, mode=mode, fullgraph=False, dynamic=True)
+            
+            dummy = self._tokenize_text("预热文本 warmup")
+            for _ in range(2):
+                self._predict_probabilities(dummy)
+            
+            self.compiled = True
+            logger.info(f"✅ 模型已通过torch.compile编译 (mode={mode})")
+        except Exception as e:
+            self.model = eager_model
+            logger.warning(f"⚠️ torch.compile编译失败，使用eager模式: {e}")
+        
+        return self.compiled
+    
+    def export_onnx(self, output_path: str = None) -> Path:
+        """
+        将当前模型导出为ONNX (一次性步骤，不在请求路径上)
+        
+        应在切换推理精度之前调用，导出的是FP32计算图
+        
+        Args:
+            output_path: 输出文件路径，默认缓存在当前模型目录旁
+            
+        Returns:
+            导出的ONNX文件路径
+        """
+        output_path = Path(output_path or self._default_onnx_path())
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        logger.info(f"📦 导出ONNX模型: {output_path}")
+        
+        dummy = self.tokenizer("预热文本 warmup", return_tensors="pt")
+        dummy = {k: v.to(self.device) for k, v in dummy.items()}
+        
+        self.model.eval()
+        torch.onnx.export(
+            _LogitsOnlyWrapper(self.model),
+            (dummy["input_ids"], dummy["attention_mask"]),
+            str(output_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"}
+            },
+            opset_version=17,
+            do_constant_folding=True
+        )
+        
+        logger.info("✅ ONNX模型导出成功")
+        return output_path
+    
+    def _default_onnx_path(self) -> Path:
+        """ONNX缓存路径: 微调模型导出到其目录下，预训练模型使用全局路径"""
+        if self.model_dir is not None:
+            return Path(self.model_dir) / "onnx" / "model.onnx"
+        return Path(MODEL_PATHS["onnx_model"])
+    
+    def _onnx_providers(self, onnx_path: Path) -> List:
+        """
+        按优先级选择ONNX Runtime执行提供者
+        
+        TensorRT可用时优先使用 (FP16，引擎缓存在ONNX文件旁，首次构建后复用)，
+        其次CUDA，最后CPU
+        """
+        available = ort.get_available_providers()
+        providers = []
+        
+        if "TensorrtExecutionProvider" in available:
+            max_shape = f"{INFERENCE_CONFIG['max_batch_size']}x{MODEL_CONFIG['max_length']}"
+            providers.append(("TensorrtExecutionProvider", {
+                "trt_fp16_enable": True,
+                "trt_engine_cache_enable": True,
+                "trt_engine_cache_path": str(trt_cache_dir(onnx_path)),
+                "trt_profile_min_shapes": "input_ids:1x1,attention_mask:1x1",
+                "trt_profile_opt_shapes": "input_ids:1x128,attention_mask:1x128",
+                "trt_profile_max_shapes": f"input_ids:{max_shape},attention_mask:{max_shape}"
+            }))
+        
+        providers.extend(p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available)
+        return providers
+    
+    def enable_onnx_backend(self, onnx_path: str = None) -> bool:
+        """
+        切换到ONNX Runtime推理后端
+        
+        ONNX文件不存在或与当前checkpoint指纹不一致时先 (重新) 导出；任何一步失败都保持PyTorch后端
+        
+        Args:
+            onnx_path: ONNX文件路径
+            
+        Returns:
+            是否成功启用
+        """
+        if ort is None:
+            logger.warning("⚠️ onnxruntime 未安装，使用PyTorch推理")
+            return False
+        
+        if not self.model_loaded or not self.tokenizer_loaded:
+            return False
+        
+        try:
+            onnx_path = Path(onnx_path or self._default_onnx_path())
+            fingerprint = checkpoint_fingerprint(self.model_dir, self.model.config)
+            ensure_onnx_export(onnx_path, fingerprint, self.export_onnx)
+            
+            # CPU推理加载INT8量化模型
+            int8 = self.quantize and self.device == "cpu"
+            if int8:
+                onnx_path = ensure_int8_onnx(onnx_path)
+            
+            sess_options = ort.SessionOptions()
+            sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            sess_options.intra_op_num_threads = TORCH_CONFIG["num_threads"]
+            
+            self.ort_session = ort.InferenceSession(
+                str(onnx_path), sess_options=sess_options, providers=self._onnx_providers(onnx_path)
+            )
+            self.precision = "onnx-int8" if int8 else "onnx"
+            logger.info(f"✅ 已启用ONNX Runtime推理后端: {self.ort_session.get_providers()}")
+            return True
+            
+        except Exception as e:
+            logger.warning(f"⚠️ ONNX Runtime后端启用失败，使用PyTorch推理: {e}")
+            self.ort_session = None
+            return False
+    
+    def _prefetch(self, inputs: Dict[str, torch.Tensor]) -> Tuple[Dict[str, torch.Tensor], Any]:
+        """
+        在独立CUDA流上异步把批次拷贝到GPU
+        
+        使用锁页内存 + non_blocking拷贝，使下一批次的拷贝与当前批次的前向计算重叠；
+        非CUDA设备或ONNX后端时原样返回
+        
+        Returns:
+            (输入张量, 拷贝完成事件或None)
+        """
+        if self.device != "cuda" or self.ort_session is not None:
+            return inputs, None
+        
+        if self._copy_stream is None:
+            self._copy_stream = torch.cuda.Stream()
+        
+        with torch.cuda.stream(self._copy_stream):
+            device_inputs = {
+                k: v.pin_memory().to(self.device, non_blocking=True)
+                for k, v in inputs.items()
+            }
+            ready = torch.cuda.Event()
+            ready.record(self._copy_stream)
+        
+        # 张量由计算流使用，告知缓存分配器避免提前复用显存
+        compute_stream = torch.cuda.current_stream()
+        for tensor in device_inputs.values():
+            tensor.record_stream(compute_stream)
+        
+        return device_inputs, ready
+    
+    def _predict_probabilities(self, inputs: Dict[str, torch.Tensor], ready=None) -> np.ndarray:
+        """
+        对已分词的批次执行前向计算
+        
+        Args:
+            inputs: 分词器输出 (CPU张量，或_prefetch返回的设备张量)
+            ready: _prefetch返回的拷贝完成事件
+            
+        Returns:
+            (B, num_labels) 的FP32 sigmoid概率，已归一化到[0, 1]并应用置信度阈值
+        """
+        return self._fetch_probabilities(self._launch_forward(inputs, ready))
+    
+    @staticmethod
+    def _fetch_probabilities(result: Union[np.ndarray, torch.Tensor]) -> np.ndarray:
+        """取回_launch_forward的结果 (设备张量时在此同步)"""
+        if isinstance(result, np.ndarray):
+            return result
+        return result.cpu().numpy()
+    
+    def _launch_forward(self, inputs: Dict[str, torch.Tensor], ready=None) -> Union[np.ndarray, torch.Tensor]:
+        """
+        发起前向计算
+        
+        PyTorch后端返回设备上的概率张量，CUDA上此时内核仍在异步执行，
+        调用方可在取回结果前准备下一批次；ONNX后端同步执行并直接返回数组
+        """
+        threshold = INFERENCE_CONFIG["confidence_threshold"]
+        
+        if self.ort_session is not None:
+            ort_inputs = {
+                "input_ids": inputs["input_ids"].numpy(),
+                "attention_mask": inputs["attention_mask"].numpy()
+            }
+            logits = self.ort_session.run(["logits"], ort_inputs)[0].astype(np.float32)
+            probabilities = 1.0 / (1.0 + np.exp(-logits))
+            
+            # FP32 sigmoid输出本身在[0, 1]内，无需clip；原地乘以阈值掩码
+            np.multiply(probabilities, probabilities > threshold, out=probabilities)
+            return probabilities
+        
+        # 移动到设备 (已预取时等待拷贝完成)
+        if ready is not None:
+            torch.cuda.current_stream().wait_event(ready)
+        else:
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        
+        with torch.inference_mode():
+            outputs = self.model(**inputs)
+            
+            # sigmoid激活 (多标签分类) 与阈值在设备上完成；logits先转回FP32，
+            # 低精度推理时也不会越出[0, 1]，无需clamp；掩码取 ~(p > t)，NaN同样被置零
+            probabilities = torch.sigmoid(outputs.logits.float())
+            probabilities.masked_fill_(~(probabilities > threshold), 0.0)
+            return probabilities
+    
     def predict_single(self, text: str, return_dict: bool = False) -> Union[np.ndarray, Dict[str, float]]:
         """兼容版单文本预测"""
         try:
             # 检查模型状态
             if not self.model_loaded or not self.tokenizer_loaded:
                 logger.warning("⚠️ 模型未正确加载，返回零向量")
-                zero_vector = np.zeros(27, dtype=np.float32)
-                return self.mapper.map_ck_vector_to_dict(zero_vector) if return_dict else zero_vector
+                return self.mapper.map_ck_vector_to_dict(_ZERO_VECTOR) if return_dict else _ZERO_VECTOR.copy()
             
             if not text or len(text.strip()) < 1:
                 logger.warning("⚠️ 输入文本为空，返回零向量")
-                zero_vector = np.zeros(27, dtype=np.float32)
-                return self.mapper.map_ck_vector_to_dict(zero_vector) if return_dict else zero_vector
-            
-            # 文本预处理和分词
-            inputs = self.tokenizer(
-                text,
-                padding=True,
-                truncation=True,
-                max_length=MODEL_CONFIG["max_length"],
-                return_tensors="pt"
-            )
-            
-            # 移动到设备
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            # 模型推理
-            self.model.eval()
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                logits = outputs.logits
-                
-                # 应用sigmoid激活 (多标签分类)
-                probabilities = torch.sigmoid(logits).cpu().numpy().flatten()
+                return self.mapper.map_ck_vector_to_dict(_ZERO_VECTOR) if return_dict else _ZERO_VECTOR.copy()
             
-            # 确保输出维度正确
-            if len(probabilities) != 27:
-                logger.error(f"❌ 模型输出维度错误: 期望27维，实际{len(probabilities)}维")
-                probabilities = np.zeros(27, dtype=np.float32)
-            
-            # 应用置信度阈值
-            threshold = INFERENCE_CONFIG["confidence_threshold"]
-            probabilities = np.where(probabilities > threshold, probabilities, 0.0)
-            
-            # 归一化到[0, 1]
-            probabilities = np.clip(probabilities, 0, 1)
+            # 复用批量预测路径 (分词缓存、推理后端与精度设置保持一致)
+            probabilities = self.predict_batch([text], batch_size=1)[0]
             
             if return_dict:
                 return self.mapper.map_ck_vector_to_dict(probabilities)
             else:
-                return probabilities.astype(np.float32)
+                return probabilities
                 
         except Exception as e:
             logger.error(f"❌ 单文本预测失败: {e}")
-            zero_vector = np.zeros(27, dtype=np.float32)
-            return self.mapper.map_ck_vector_to_dict(zero_vector) if return_dict else zero_vector
+            return self.mapper.map_ck_vector_to_dict(_ZERO_VECTOR) if return_dict else _ZERO_VECTOR.copy()
     
     def predict_batch(self, texts: List[str], batch_size: int = None) -> np.ndarray:
-        """批量文本情感预测"""
+        """
+        批量文本情感预测
+        
+        全部文本只分词一次，按token长度分桶后逐桶填充并前向计算，
+        避免短文本被填充到长文本的长度；空文本保持零向量
+        
+        Args:
+            texts: 文本列表
+            batch_size: 批处理大小
+            
+        Returns:
+            (N, 27) 情绪向量矩阵 (模型未加载或失败时为零矩阵)
+        """
         try:
             if not texts:
                 return np.zeros((0, 27), dtype=np.float32)
             
-            results = []
-            for text in texts:
-                result = self.predict_single(text)
-                results.append(result)
+            if not self.model_loaded or not self.tokenizer_loaded:
+                logger.warning("⚠️ 模型未正确加载，返回零向量")
+                return np.zeros((len(texts), 27), dtype=np.float32)
+            
+            batch_size = batch_size or INFERENCE_CONFIG["max_batch_size"]
+            results = np.zeros((len(texts), 27), dtype=np.float32)
             
-            return np.array(results)
+            # 只对非空文本做推理
+            valid_indices = [i for i, text in enumerate(texts) if text and text.strip()]
+            if not valid_indices:
+                return results
+            
+            # 分词 (不填充)，用于获取长度并按桶复用
+            input_ids = self._encode_texts([texts[i] for i in valid_indices])
+            lengths = [len(ids) for ids in input_ids]
+            
+            buckets = self._length_buckets(lengths, batch_size, INFERENCE_CONFIG["length_bucket_ratio"])
+            
+            # 桶内填充到最长序列；下一个桶的填充与拷贝和当前桶的前向计算重叠 (双缓冲)
+            def pad_bucket(bucket):
+                return self.tokenizer.pad(
+                    {
+                        "input_ids": [input_ids[j] for j in bucket],
+                        "attention_mask": [[1] * lengths[j] for j in bucket]
+                    },
+                    padding=True,
+                    return_tensors="pt"
+                )
+            
+            next_batch = self._prefetch(pad_bucket(buckets[0]))
+            for n, bucket in enumerate(buckets):
+                batch_indices = [valid_indices[j] for j in bucket]
+                
+                # 发起当前桶的前向计算，在GPU执行期间填充并拷贝下一个桶
+                inputs, ready = next_batch
+                pending = self._launch_forward(inputs, ready)
+                if n + 1 < len(buckets):
+                    next_batch = self._prefetch(pad_bucket(buckets[n + 1]))
+                
+                probabilities = self._fetch_probabilities(pending)
+                
+                # 确保输出维度正确
+                if probabilities.shape[-1] != 27:
+                    logger.error(f"❌ 模型输出维度错误: 期望27维，实际{probabilities.shape[-1]}维")
+                    continue
+                
+                results[batch_indices] = probabilities
+            
+            return results
             
         except Exception as e:
             logger.error(f"❌ 批量预测失败: {e}")
             return np.zeros((len(texts), 27), dtype=np.float32)
     
+    @staticmethod
+    def _length_buckets(lengths: List[int], batch_size: int, max_ratio: float) -> List[List[int]]:
+        """
+        按序列长度分桶
+        
+        排序后顺序切分，每个桶不超过batch_size条，且桶内最长序列不超过最短序列的max_ratio倍
+        
+        Args:
+            lengths: 每条文本的token数
+            batch_size: 单桶最大条数
+            max_ratio: 桶内最长/最短长度上限
+            
+        Returns:
+            由lengths下标组成的桶列表
+        """
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        
+        buckets = []
+        current = []
+        for idx in order:
+            if current and (len(current) >= batch_size or lengths[idx] > lengths[current[0]] * max_ratio):
+                buckets.append(current)
+                current = []
+            current.append(idx)
+        
+        if current:
+            buckets.append(current)
+        
+        return buckets
+    
     def get_top_emotions(self, text: str, top_k: int = 5) -> List[Tuple[str, float]]:
         """获取文本的top-k情绪"""
         emotion_vector = self.predict_single(text)
@@ -274,6 +747,8 @@ class CompatibleEmotionClassifier(nn.Module):
             'model_loaded': self.model_loaded,
             'tokenizer_loaded': self.tokenizer_loaded,
             'device': self.device,
+            'precision': self.precision,
+            'compiled': self.compiled,
             'model_name': self.model_name,
             'num_labels': self.num_labels
         }
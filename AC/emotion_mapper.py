@@ -11,6 +11,7 @@ import pandas as pd
 import logging
 from typing import Dict, List, Tuple, Union, Any
 from collections import defaultdict
+from functools import lru_cache
 
 try:
     from .config import (
@@ -45,6 +46,11 @@ class GoEmotionsMapper:
         for ge_label, ck_emotion in self.mapping.items():
             self.ck_to_goemotions[ck_emotion].append(ge_label)
         
+        # 映射矩阵 (GoEmotions标签 × C&K情绪)，批量映射为一次矩阵乘法
+        self.mapping_matrix = np.zeros((len(self.goemotions_labels), len(self.ck_emotions)), dtype=np.float32)
+        for ge_label, ck_emotion in self.mapping.items():
+            self.mapping_matrix[self.goemotions_to_index[ge_label], self.ck_to_index[ck_emotion]] = 1.0
+        
         logger.info("✅ GoEmotions映射器初始化完成")
         logger.info(f"   支持映射: {len(self.mapping)} GoEmotions标签 → {len(self.ck_emotions)} C&K情绪")
     
@@ -94,6 +100,36 @@ class GoEmotionsMapper:
             # 返回零向量作为fallback
             return np.zeros(27, dtype=np.float32)
     
+    def map_batch(self, ge_matrix: np.ndarray) -> np.ndarray:
+        """
+        批量将GoEmotions分数矩阵映射为C&K情绪矩阵
+        
+        与map_goemotions_to_ck_vector逐行结果一致: 只累加正分数 (NaN视为0)，再归一化到[0, 1]
+        
+        Args:
+            ge_matrix: (N, 27) 按GOEMOTIONS_LABELS顺序的分数矩阵
+            
+        Returns:
+            np.ndarray: (N, 27) C&K情绪矩阵
+        """
+        ge_matrix = np.asarray(ge_matrix, dtype=np.float32)
+        positive = np.where(ge_matrix > 0, ge_matrix, 0.0).astype(np.float32)
+        return np.clip(positive @ self.mapping_matrix, 0.0, 1.0)
+    
+    def join_active_labels(self, ge_matrix: np.ndarray) -> np.ndarray:
+        """
+        每行分数为正的GoEmotions标签按GOEMOTIONS_LABELS顺序以逗号拼接
+        
+        Args:
+            ge_matrix: (N, 27) 按GOEMOTIONS_LABELS顺序的分数矩阵
+            
+        Returns:
+            np.ndarray: 长度N的字符串数组
+        """
+        labels_with_sep = np.array([label + ',' for label in self.goemotions_labels], dtype=object)
+        joined = np.where(np.asarray(ge_matrix) > 0, labels_with_sep, '').sum(axis=1)
+        return pd.Series(joined, dtype=object).str.rstrip(',').to_numpy()
+    
     def map_ck_vector_to_dict(self, ck_vector: np.ndarray) -> Dict[str, float]:
         """
         将27维C&K向量转换为情绪字典
@@ -133,11 +169,14 @@ class GoEmotionsMapper:
             # 处理每一行
             processed_data = []
             
-            for idx, row in df.iterrows():
-                text = row['text']
+            # 按列取出Python标量列表后逐行zip，避免iterrows为每行构造Series
+            columns = [df[col].tolist() for col in required_cols]
+            
+            for idx, row in enumerate(zip(*columns)):
+                text = row[0]
                 
                 # 提取GoEmotions分数
-                ge_scores = {label: row[label] for label in self.goemotions_labels if label in row}
+                ge_scores = dict(zip(self.goemotions_labels, row[1:]))
                 
                 # 映射到C&K向量
                 ck_vector = self.map_goemotions_to_ck_vector(ge_scores)
@@ -252,6 +291,15 @@ class GoEmotionsMapper:
         except Exception:
             return False
 
+@lru_cache(maxsize=1)
+def get_shared_mapper() -> GoEmotionsMapper:
+    """
+    获取进程内共享的映射器实例
+    
+    映射表只读，分类器、推理API等调用方共用一个实例，避免重复构建
+    """
+    return GoEmotionsMapper()
+
 def main():
     """测试映射器功能"""
     print("🔄 GoEmotions映射器测试")
@@ -10,7 +10,6 @@ import sys
 import os
 import numpy as np
 import logging
-import pandas as pd
 from typing import Dict, List, Union, Optional, Any
 from pathlib import Path
 
@@ -18,37 +17,53 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 try:
-    from .emotion_classifier import CompatibleEmotionClassifier as EmotionClassifier
-    from .emotion_mapper import GoEmotionsMapper
+    from .emotion_classifier import CompatibleEmotionClassifier as EmotionClassifier, configure_torch_runtime
+    from .emotion_mapper import get_shared_mapper
+    from .time_utils import cached_timestamp
 except ImportError:
-    from emotion_classifier import CompatibleEmotionClassifier as EmotionClassifier
-    from emotion_mapper import GoEmotionsMapper
+    from emotion_classifier import CompatibleEmotionClassifier as EmotionClassifier, configure_torch_runtime
+    from emotion_mapper import get_shared_mapper
+    from time_utils import cached_timestamp
 try:
-    from .config import COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG, MODEL_PATHS
+    from .config import (
+        COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG, MODEL_PATHS,
+        POSITIVE_MASK, NEGATIVE_MASK, NEUTRAL_MASK
+    )
 except ImportError:
-    from config import COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG, MODEL_PATHS
+    from config import (
+        COWEN_KELTNER_EMOTIONS, INFERENCE_CONFIG, MODEL_PATHS,
+        POSITIVE_MASK, NEGATIVE_MASK, NEUTRAL_MASK
+    )
 
 logger = logging.getLogger(__name__)
 
 class EmotionInferenceAPI:
     """情感分析推理API"""
     
-    def __init__(self, model_path: str = None, load_finetuned: bool = True):
+    def __init__(self, model_path: str = None, load_finetuned: bool = True,
+                 classifier: Optional[EmotionClassifier] = None):
         """
         初始化推理API
         
         Args:
             model_path: 自定义模型路径
             load_finetuned: 是否加载微调模型
+            classifier: 已加载的分类器实例，提供时直接复用，不再加载模型
         """
         self.emotion_names = COWEN_KELTNER_EMOTIONS
         self.model_path = model_path
         
+        # 在加载模型前设置PyTorch线程数
+        configure_torch_runtime()
+        
         # 初始化分类器
-        self.classifier = EmotionClassifier(load_pretrained=not load_finetuned)
+        if classifier is not None:
+            self.classifier = classifier
+        else:
+            self.classifier = EmotionClassifier(load_pretrained=not load_finetuned)
         
         # 尝试加载微调模型
-        if load_finetuned:
+        if load_finetuned and classifier is None:
             try:
                 finetuned_path = model_path or MODEL_PATHS["finetuned_model"]
                 if Path(finetuned_path).exists():
@@ -59,8 +74,18 @@ class EmotionInferenceAPI:
             except Exception as e:
                 logger.warning(f"⚠️  微调模型加载失败，使用预训练模型: {e}")
         
+        # 推理后端: ONNX Runtime (首次启动时一次性导出) 或 PyTorch
+        backend = INFERENCE_CONFIG["backend"]
+        use_onnx = backend in ("auto", "onnx") and self.classifier.enable_onnx_backend()
+        
+        # PyTorch后端按设备切换推理精度 (GPU: FP16/BF16, CPU: INT8)
+        if not use_onnx:
+            self.classifier.apply_inference_precision(INFERENCE_CONFIG["precision"])
+            if INFERENCE_CONFIG["torch_compile"]:
+                self.classifier.compile_model()
+        
         # 初始化映射器
-        self.mapper = GoEmotionsMapper()
+        self.mapper = get_shared_mapper()
         
         logger.info("✅ 情感推理API初始化完成")
     
@@ -177,49 +202,79 @@ class EmotionInferenceAPI:
         try:
             # 基础情感分析
             emotion_vector = self.analyze_single_text(text, output_format="vector")
-            emotion_dict = self.mapper.map_ck_vector_to_dict(emotion_vector)
-            top_emotions = self.mapper.get_top_emotions_from_vector(emotion_vector, 5)
-            
-            # 计算统计信息
-            total_intensity = float(np.sum(emotion_vector))
-            max_intensity = float(np.max(emotion_vector))
-            active_emotions = len([score for score in emotion_vector if score > 0.1])
+            return self._build_context_result(text, emotion_vector)
             
-            # 情感分类
-            positive_emotions = ["快乐", "兴奋", "娱乐", "钦佩", "崇拜", "审美欣赏", "敬畏", "入迷", "兴趣", "浪漫"]
-            negative_emotions = ["愤怒", "焦虑", "悲伤", "恐惧", "内疚", "恐怖", "失望", "厌恶", "嫉妒", "蔑视"]
-            neutral_emotions = ["平静", "无聊", "困惑", "尴尬", "同情", "渴望", "怀旧"]
-            
-            positive_score = sum(emotion_dict[e] for e in positive_emotions if e in emotion_dict)
-            negative_score = sum(emotion_dict[e] for e in negative_emotions if e in emotion_dict)
-            neutral_score = sum(emotion_dict[e] for e in neutral_emotions if e in emotion_dict)
+        except Exception as e:
+            logger.error(f"❌ 上下文情感分析失败: {e}")
+            return self._build_error_result(text, e)
+    
+    def analyze_emotion_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        批量带上下文的情感分析
+        
+        所有文本共享一次分词和前向计算，结果格式与analyze_emotion_with_context一致
+        
+        Args:
+            texts: 文本列表
             
-            return {
-                "input_text": text,
-                "emotion_vector": emotion_vector.tolist(),
-                "emotion_dict": emotion_dict,
-                "top_emotions": top_emotions,
-                "statistics": {
-                    "total_intensity": total_intensity,
-                    "max_intensity": max_intensity,
-                    "active_emotions_count": active_emotions,
-                    "emotion_balance": {
-                        "positive": positive_score,
-                        "negative": negative_score,
-                        "neutral": neutral_score
-                    }
-                },
-                "primary_emotion": top_emotions[0] if top_emotions else ("平静", 0.0),
-                "analysis_timestamp": pd.Timestamp.now().isoformat()
-            }
+        Returns:
+            与texts顺序一致的分析结果列表
+        """
+        if not texts:
+            return []
+        
+        try:
+            emotion_matrix = self.analyze_batch_texts(texts)
+            return [
+                self._build_context_result(text, emotion_vector)
+                for text, emotion_vector in zip(texts, emotion_matrix)
+            ]
             
         except Exception as e:
-            logger.error(f"❌ 上下文情感分析失败: {e}")
-            return {
-                "input_text": text,
-                "emotion_vector": np.zeros(27).tolist(),
-                "error": str(e)
-            }
+            logger.error(f"❌ 批量上下文情感分析失败: {e}")
+            return [self._build_error_result(text, e) for text in texts]
+    
+    def _build_context_result(self, text: str, emotion_vector: np.ndarray) -> Dict[str, Any]:
+        """根据27维情感向量构建上下文分析结果"""
+        emotion_dict = self.mapper.map_ck_vector_to_dict(emotion_vector)
+        top_emotions = self.mapper.get_top_emotions_from_vector(emotion_vector, 5)
+        
+        # 计算统计信息
+        total_intensity = float(np.sum(emotion_vector))
+        max_intensity = float(np.max(emotion_vector))
+        active_emotions = int(np.count_nonzero(emotion_vector > 0.1))
+        
+        # 情感分类 (预计算掩码求和)
+        positive_score = float(emotion_vector[POSITIVE_MASK].sum())
+        negative_score = float(emotion_vector[NEGATIVE_MASK].sum())
+        neutral_score = float(emotion_vector[NEUTRAL_MASK].sum())
+        
+        return {
+            "input_text": text,
+            "emotion_vector": emotion_vector.tolist(),
+            "emotion_dict": emotion_dict,
+            "top_emotions": top_emotions,
+            "statistics": {
+                "total_intensity": total_intensity,
+                "max_intensity": max_intensity,
+                "active_emotions_count": active_emotions,
+                "emotion_balance": {
+                    "positive": positive_score,
+                    "negative": negative_score,
+                    "neutral": neutral_score
+                }
+            },
+            "primary_emotion": top_emotions[0] if top_emotions else ("平静", 0.0),
+            "analysis_timestamp": cached_timestamp()
+        }
+    
+    def _build_error_result(self, text: str, error: Exception) -> Dict[str, Any]:
+        """构建分析失败时的默认结果"""
+        return {
+            "input_text": text,
+            "emotion_vector": np.zeros(27).tolist(),
+            "error": str(error)
+        }
     
     def test_kg_integration(self, test_texts: List[str] = None) -> Dict[str, Any]:
         """
@@ -130,20 +130,15 @@ class ModelTrainer:
             if all(emotion in df.columns for emotion in COWEN_KELTNER_EMOTIONS):
                 logger.info("   检测到C&K格式数据，直接使用")
                 texts = df['text'].tolist()
-                labels = df[COWEN_KELTNER_EMOTIONS].values.astype(np.float32)
+                labels = df[list(COWEN_KELTNER_EMOTIONS)].values.astype(np.float32)
             else:
                 # GoEmotions格式，需要转换
                 logger.info("   检测到GoEmotions格式，开始转换")
                 texts = df['text'].tolist()
                 
-                # 转换标签
-                labels_list = []
-                for idx, row in df.iterrows():
-                    ge_scores = {label: row[label] for label in self.mapper.goemotions_labels if label in row}
-                    ck_vector = self.mapper.map_goemotions_to_ck_vector(ge_scores)
-                    labels_list.append(ck_vector)
-                
-                labels = np.array(labels_list, dtype=np.float32)
+                # 转换标签 (缺失的标签列视为0，一次矩阵乘法完成映射)
+                ge_matrix = df.reindex(columns=self.mapper.goemotions_labels, fill_value=0.0).to_numpy(dtype=np.float32)
+                labels = self.mapper.map_batch(ge_matrix)
             
             # 数据验证
             assert len(texts) == len(labels), "文本和标签数量不匹配"
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+ONNX导出缓存管理
+
+导出的FP32计算图、INT8量化模型和TensorRT引擎缓存都保存在模型目录旁，
+按checkpoint指纹校验 (config.json内容 + 权重文件大小与修改时间)，
+重新训练或替换权重后自动清除旧缓存并重新导出
+"""
+
+import hashlib
+import logging
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 参与指纹计算的权重文件 (含分片索引)
+_WEIGHT_FILE_PATTERNS = ("*.safetensors", "*.bin", "*.safetensors.index.json", "*.bin.index.json")
+
+def checkpoint_fingerprint(model_dir: Optional[str], model_config: Any) -> str:
+    """
+    计算checkpoint指纹
+    
+    Args:
+        model_dir: 微调模型目录 (预训练模型为None)
+        model_config: 已加载模型的PretrainedConfig，目录中没有config.json时使用
+    
+    Returns:
+        十六进制指纹字符串
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    
+    config_file = Path(model_dir) / "config.json" if model_dir is not None else None
+    if config_file is not None and config_file.exists():
+        digest.update(config_file.read_bytes())
+    else:
+        # 预训练模型: 以模型名和配置内容标识
+        digest.update(str(getattr(model_config, "name_or_path", "")).encode("utf-8"))
+        digest.update(model_config.to_json_string().encode("utf-8"))
+    
+    if model_dir is not None:
+        weight_files = sorted({path for pattern in _WEIGHT_FILE_PATTERNS for path in Path(model_dir).glob(pattern)})
+        for path in weight_files:
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    
+    return digest.hexdigest()
+
+def int8_onnx_path(onnx_path: Path) -> Path:
+    """INT8量化模型的缓存路径"""
+    return onnx_path.with_name(f"{onnx_path.stem}_int8.onnx")
+
+def trt_cache_dir(onnx_path: Path) -> Path:
+    """TensorRT引擎缓存目录"""
+    return onnx_path.parent / "trt_cache"
+
+def _fingerprint_file(onnx_path: Path) -> Path:
+    """记录导出时checkpoint指纹的旁路文件"""
+    return onnx_path.with_suffix(".fingerprint")
+
+def ensure_onnx_export(onnx_path: Path, fingerprint: str, export: Callable[[str], Any]) -> Path:
+    """
+    确保onnx_path是当前checkpoint的导出结果
+    
+    指纹一致时直接复用；否则删除旧的FP32/INT8模型和TensorRT引擎缓存，
+    调用export重新导出后写入指纹
+    
+    Args:
+        onnx_path: FP32 ONNX文件路径
+        fingerprint: checkpoint_fingerprint()的结果
+        export: 导出函数，参数为输出路径
+    
+    Returns:
+        onnx_path
+    """
+    marker = _fingerprint_file(onnx_path)
+    if onnx_path.exists() and marker.exists() and marker.read_text().strip() == fingerprint:
+        return onnx_path
+    
+    if onnx_path.exists():
+        logger.info(f"🔧 checkpoint已变化，重新导出ONNX模型: {onnx_path}")
+    
+    for stale in (onnx_path, int8_onnx_path(onnx_path), marker):
+        if stale.exists():
+            stale.unlink()
+    shutil.rmtree(trt_cache_dir(onnx_path), ignore_errors=True)
+    
+    export(str(onnx_path))
+    marker.write_text(fingerprint)
+    return onnx_path
+
+def ensure_int8_onnx(onnx_path: Path) -> Path:
+    """
+    对FP32 ONNX模型做INT8动态量化 (结果缓存在原文件旁，随ensure_onnx_export一起失效)
+    
+    Args:
+        onnx_path: FP32 ONNX文件路径
+    
+    Returns:
+        INT8 ONNX文件路径
+    """
+    int8_path = int8_onnx_path(onnx_path)
+    if int8_path.exists():
+        return int8_path
+    
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    logger.info(f"📦 量化ONNX模型 (INT8): {int8_path}")
+    quantize_dynamic(str(onnx_path), str(int8_path), weight_type=QuantType.QInt8)
+    return int8_path
@@ -47,49 +47,21 @@ def process_goemotions_to_ck():
         # 转换为C&K格式
         logger.info("🔄 转换为C&K 27维格式...")
         
-        result_data = []
-        conversion_stats = {ck_emotion: 0 for ck_emotion in COWEN_KELTNER_EMOTIONS}
+        # 提取GoEmotions分数矩阵 (缺失的标签列视为0) 并一次性映射到C&K
+        ge_matrix = df.reindex(columns=GOEMOTIONS_LABELS, fill_value=0.0).to_numpy(dtype=np.float32)
+        ck_matrix = mapper.map_batch(ge_matrix)
         
-        for idx, row in df.iterrows():
-            try:
-                text = row['text']
-                
-                # 提取GoEmotions分数
-                ge_scores = {}
-                for label in GOEMOTIONS_LABELS:
-                    if label in df.columns:
-                        ge_scores[label] = float(row[label]) if pd.notna(row[label]) else 0.0
-                
-                # 映射到C&K向量
-                ck_vector = mapper.map_goemotions_to_ck_vector(ge_scores)
-                
-                # 构建数据行
-                data_row = {'text': text}
-                
-                # 添加C&K情绪列
-                for i, emotion in enumerate(COWEN_KELTNER_EMOTIONS):
-                    data_row[emotion] = float(ck_vector[i])
-                    if ck_vector[i] > 0:
-                        conversion_stats[emotion] += 1
-                
-                # 添加元数据
-                active_ge_labels = [label for label, score in ge_scores.items() if score > 0]
-                data_row['original_goemotions'] = ','.join(active_ge_labels)
-                data_row['max_emotion'] = COWEN_KELTNER_EMOTIONS[np.argmax(ck_vector)]
-                data_row['emotion_intensity'] = float(np.max(ck_vector))
-                data_row['total_intensity'] = float(np.sum(ck_vector))
-                
-                result_data.append(data_row)
-                
-                if (idx + 1) % 5000 == 0:
-                    logger.info(f"   转换进度: {idx + 1}/{len(df)}")
-                    
-            except Exception as e:
-                logger.warning(f"⚠️  第{idx}行转换失败: {e}")
-                continue
+        # 构建结果: 文本 + C&K情绪列 + 元数据
+        result_df = pd.DataFrame(ck_matrix, columns=COWEN_KELTNER_EMOTIONS)
+        result_df.insert(0, 'text', df['text'].to_numpy())
+        result_df['original_goemotions'] = mapper.join_active_labels(ge_matrix)
+        result_df['max_emotion'] = np.asarray(COWEN_KELTNER_EMOTIONS)[ck_matrix.argmax(axis=1)]
+        result_df['emotion_intensity'] = ck_matrix.max(axis=1)
+        result_df['total_intensity'] = ck_matrix.sum(axis=1)
+        
+        conversion_stats = dict(zip(COWEN_KELTNER_EMOTIONS, np.count_nonzero(ck_matrix > 0, axis=0).tolist()))
         
         # 保存结果
-        result_df = pd.DataFrame(result_data)
         output_path = data_dir / f"processed_{split}.csv"
         result_df.to_csv(output_path, index=False, encoding='utf-8')
         
@@ -36,7 +36,7 @@ check_python_env() {
     echo -e "${BLUE}🔍 检查Python环境...${NC}"
     
     if ! command -v python3 &> /dev/null; then
-        echo -e "${RED}❌ 未找到Python 3，请确保已安装Python 3.7+${NC}"
+        echo -e "${RED}❌ 未找到Python 3，请确保已安装Python 3.8+${NC}"
         exit 1
     fi
     
@@ -56,7 +56,7 @@ check_dependencies() {
     echo -e "${BLUE}🔍 检查依赖包...${NC}"
     
     # 必需的包列表
-    REQUIRED_PACKAGES=("flask" "flask-cors" "transformers" "torch" "numpy" "pandas")
+    REQUIRED_PACKAGES=("flask" "flask-cors" "transformers" "torch" "numpy" "pandas" "msgspec")
     
     for package in "${REQUIRED_PACKAGES[@]}"; do
         if python3 -c "import $package" &> /dev/null; then
@@ -68,6 +68,12 @@ check_dependencies() {
         fi
     done
     
+    # 生产模式使用gunicorn多进程服务 (可选)
+    if ! command -v gunicorn &> /dev/null; then
+        echo -e "${YELLOW}⚠️  gunicorn 未安装，将使用Flask开发服务器${NC}"
+        echo -e "${YELLOW}提示: pip install gunicorn${NC}"
+    fi
+    
     if [[ "$MISSING_DEPS" == "true" ]]; then
         echo -e "${RED}❌ 存在缺失的依赖包，请先安装${NC}"
         exit 1
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+时间戳工具
+
+接口响应的时间戳格式与 datetime.now().isoformat() 一致 (微秒精度)，
+按整秒缓存日期时间部分的格式化结果，每次调用只拼接微秒，
+避免逐请求构造datetime对象和完整格式化
+"""
+
+import time
+from typing import Tuple
+
+_timestamp_cache: Tuple[int, str] = (-1, "")
+
+def cached_timestamp() -> str:
+    """
+    返回当前本地时间的ISO 8601字符串 (如 2024-01-01T12:00:00.123456)
+    
+    与isoformat()相同，微秒恰为0时省略小数部分；
+    秒级前缀缓存为(整秒, 字符串)元组，整体替换赋值，多线程下无需加锁
+    """
+    global _timestamp_cache
+    
+    now, nanoseconds = divmod(time.time_ns(), 1_000_000_000)
+    microseconds = nanoseconds // 1000
+    
+    cached_second, prefix = _timestamp_cache
+    if now != cached_second:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now))
+        _timestamp_cache = (now, prefix)
+    
+    if microseconds:
+        return f"{prefix}.{microseconds:06d}"
+    return prefix
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+EmoHeal API WSGI入口
+
+生产环境使用gunicorn启动:
+    CPU: WEB_CONCURRENCY=$(nproc) gunicorn -k sync --preload wsgi:app
+    GPU: gunicorn -w 1 -k gthread --threads 8 wsgi:app
+
+CPU下 --preload 使模型在master进程中加载一次，fork后的worker共享同一份权重；
+GPU下不能使用 --preload，CUDA上下文无法跨fork继承，模型须在worker进程内加载
+CPU下worker数通过WEB_CONCURRENCY传入，config按此均分每个worker的推理线程数
+开发时可设置 AC_SKIP_WARMUP=1 跳过启动预热，AC_LAZY_INIT=1 推迟到首个请求再初始化
+"""
+
+from api_server import app  # 导入时完成模型初始化
+
+__all__ = ["app"]